@@ -1,116 +1,224 @@
-import os
-import uuid
-import shutil
-import torch
-from fastapi import FastAPI, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
-
-from backend.detection.densenet.infer import predict_image
-from backend.detection.swinunetr.model import get_autoencoder_model
-from backend.detection.swinunetr.infer import run_ct_inference
-
-# ------------------------------------------------------------------
-# App initialization (ORDER MATTERS)
-# ------------------------------------------------------------------
-
-app = FastAPI(title="AuraMed AI Backend")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Next.js frontend
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ------------------------------------------------------------------
-# Global config
-# ------------------------------------------------------------------
-
-UPLOAD_DIR = "temp"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-CT_THRESHOLD = 0.03365  # your computed threshold
-
-# Define device ONCE, globally
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# ------------------------------------------------------------------
-# API Endpoint
-# ------------------------------------------------------------------
-
-@app.post("/analyze")
-async def analyze_image(
-    file: UploadFile = File(...),
-    modality: str = "xray"
-):
-    file_id = str(uuid.uuid4())
-    path = f"{UPLOAD_DIR}/{file_id}_{file.filename}"
-
-    with open(path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-    try:
-        # -------------------------------
-        # XRAY / MRI (Classification)
-        # -------------------------------
-        if modality in ["xray", "mri"]:
-
-            model_path = (
-                "backend/models/densenet_xray.pth"
-                if modality == "xray"
-                else "backend/models/densenet_mri.pth"
-            )
-
-            cls_prob = predict_image(path, model_path)
-            abnormal_prob = cls_prob["abnormal"]
-
-            result = {
-                "modality": modality,
-                "classification_confidence": float(abnormal_prob),
-                "anomaly": bool(abnormal_prob > 0.9),
-            }
-
-            return result
-
-        # -------------------------------
-        # CT (Autoencoder Anomaly Detection)
-        # -------------------------------
-        elif modality == "ct":
-
-            model = get_autoencoder_model(DEVICE)
-            model.load_state_dict(
-                torch.load(
-                    "backend/models/ct_autoencoder.pth",
-                    map_location=DEVICE,
-                )
-            )
-            model.eval()
-
-            score, anomaly_map = run_ct_inference(path, model, DEVICE)
-
-            CT_THRESHOLD = 0.0026848210603930044
-
-            anomaly = score > CT_THRESHOLD
-
-
-            result = {
-                "modality": "ct",
-                "anomaly_score": float(score),
-                "threshold": CT_THRESHOLD,
-                "anomaly": anomaly,
-                "decision": "abnormal" if anomaly else "normal",
-                "note": "CT anomaly detection using SwinUNETR autoencoder",
-            }
-
-            return result
-
-        else:
-            return {
-                "error": f"Unsupported modality: {modality}"
-            }
-
-    finally:
-        # Optional: clean temp file after request
-        if os.path.exists(path):
-            os.remove(path)
+import os
+import json
+import asyncio
+from typing import List
+from contextlib import asynccontextmanager
+import torch
+from fastapi import FastAPI, UploadFile, File
+from fastapi.responses import StreamingResponse
+from fastapi.middleware.cors import CORSMiddleware
+
+from backend.detection.densenet.infer import TTA_ENABLED, pipeline_params, predict_image
+from backend.detection.swinunetr.infer import run_ct_inference
+from backend.detection.registry import get_registry
+from backend.detection.densenet.batcher import batcher_stats
+from backend.detection.densenet.cascade import cascade_stats
+from backend.utils.executor import ExecutorBusy, busy_handler, get_executor
+from backend.utils.memory import process_memory
+from backend.utils.readiness import Readiness
+from backend.utils.result_cache import get_result_cache
+from backend.utils.uploads import SpooledUpload
+
+# ------------------------------------------------------------------
+# App initialization (ORDER MATTERS)
+# ------------------------------------------------------------------
+
+readiness = Readiness()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load + warm every model in the background; /ready flips to 200 when done
+    readiness.start([
+        (name, lambda name=name: get_registry().warmup(name))
+        for name in ("densenet_xray", "densenet_mri", "ct_autoencoder")
+    ])
+    yield
+
+app = FastAPI(title="AuraMed AI Backend", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],  # Next.js frontend
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Full executor queue -> 429 + Retry-After
+app.add_exception_handler(ExecutorBusy, busy_handler)
+
+# ------------------------------------------------------------------
+# Global config
+# ------------------------------------------------------------------
+
+CT_THRESHOLD = 0.03365  # your computed threshold
+
+# Define device ONCE, globally
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+DENSENET_MODELS = {
+    "xray": "backend/models/densenet_xray.pth",
+    "mri": "backend/models/densenet_mri.pth",
+}
+
+# Executor slots one batch upload holds (its images in flight at once); with
+# batching on, their forwards meet in the shared DenseNet batcher
+BATCH_UPLOAD_SLOTS = int(os.environ.get("AURAMED_BATCH_UPLOAD_SLOTS", "4"))
+
+# ------------------------------------------------------------------
+# API Endpoints
+# ------------------------------------------------------------------
+
+@app.get("/ready")
+def ready():
+    return readiness.response()
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "models": get_registry().stats(),
+        "batching": batcher_stats(),
+        "cascade": cascade_stats(),
+        "result_cache": get_result_cache().stats(),
+        "executor": get_executor().stats(),
+        "memory": process_memory(),
+    }
+
+
+@app.post("/analyze")
+async def analyze_image(
+    file: UploadFile = File(...),
+    modality: str = "xray",
+    tta: bool = TTA_ENABLED
+):
+    # Upload spooling, decoding and inference all run in the bounded executor
+    return await get_executor().run(run_analysis, file.file, file.filename, modality, tta)
+
+
+def run_analysis(fileobj, filename, modality, tta=False):
+    # Decoded straight from the upload buffer (spills to disk only when large)
+    with SpooledUpload(fileobj, filename) as upload:
+        return analyze_upload(upload, modality, tta)
+
+
+def classification_result(modality, cls_prob):
+    abnormal_prob = cls_prob["abnormal"]
+
+    result = {
+        "modality": modality,
+        "classification_confidence": float(abnormal_prob),
+        "anomaly": bool(abnormal_prob > 0.9),
+    }
+    if "stage" in cls_prob:
+        result["cascade_stage"] = cls_prob["stage"]
+    if "tta" in cls_prob:
+        # Disagreement between the augmented views
+        result["classification_spread"] = cls_prob["tta"]["std"]["abnormal"]
+        result["tta"] = cls_prob["tta"]
+    return result
+
+
+def analyze_upload(upload, modality, tta=False):
+    # Same bytes + same models + same settings -> stored result
+    cache = get_result_cache()
+    key = cache.key(upload.digest, modality, endpoint="/analyze", **pipeline_params(tta=tta))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    # -------------------------------
+    # XRAY / MRI (Classification)
+    # -------------------------------
+    if modality in ["xray", "mri"]:
+
+        model_path = DENSENET_MODELS[modality]
+
+        cls_prob = predict_image(upload.stream(), model_path, tta=tta)
+        result = classification_result(modality, cls_prob)
+
+        cache.put(key, result)
+        return result
+
+    # -------------------------------
+    # CT (Autoencoder Anomaly Detection)
+    # -------------------------------
+    elif modality == "ct":
+
+        # Resident, eval-mode instance (loaded once by the registry)
+        model = get_registry().get("ct_autoencoder")
+
+        score, anomaly_map = run_ct_inference(upload.stream(), model, DEVICE)
+
+        CT_THRESHOLD = 0.0026848210603930044
+
+        anomaly = score > CT_THRESHOLD
+
+
+        result = {
+            "modality": "ct",
+            "anomaly_score": float(score),
+            "threshold": CT_THRESHOLD,
+            "anomaly": anomaly,
+            "decision": "abnormal" if anomaly else "normal",
+            "note": "CT anomaly detection using SwinUNETR autoencoder",
+        }
+
+        cache.put(key, result)
+        return result
+
+    else:
+        return {
+            "error": f"Unsupported modality: {modality}"
+        }
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    modality: str = "xray",
+    tta: bool = TTA_ENABLED
+):
+    """
+    Classify many X-ray/MRI images in one request, each through the same
+    pipeline and result cache as /analyze.
+    Results are streamed as NDJSON lines in completion order, followed by
+    a final summary line.
+    """
+    if modality not in DENSENET_MODELS:
+        return {"error": f"Unsupported modality for batch analysis: {modality}"}
+
+    # Admission first (429 when the queue is full): the batch holds up to
+    # BATCH_UPLOAD_SLOTS executor slots and each image is spooled in its job
+    futures = get_executor().run_many(
+        run_analysis, [(file.file, file.filename, modality, tta) for file in files], BATCH_UPLOAD_SLOTS
+    )
+
+    async def collect(index, filename, future):
+        try:
+            result = await asyncio.wrap_future(future)
+            return {"index": index, "filename": filename, **result}
+        except Exception as e:
+            return {"index": index, "filename": filename, "error": str(e)}
+
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(collect(i, file.filename, future))
+            for i, (file, future) in enumerate(zip(files, futures))
+        ]
+        try:
+            failed = 0
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                failed += "error" in result
+                yield json.dumps(result) + "\n"
+
+            yield json.dumps({"done": True, "count": len(tasks), "failed": failed}) + "\n"
+        finally:
+            # Images not started yet are skipped; running ones finish and free their slot
+            for future in futures:
+                future.cancel()
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,118 @@
+import os
+import logging
+
+import numpy as np
+import torch
+
+logger = logging.getLogger("backends")
+
+# eager       -> plain PyTorch module
+# torchscript -> <name>.ts produced by backend/detection/export.py
+# compile     -> torch.compile() graph of the eager module
+# onnx        -> <name>.onnx served through ONNX Runtime (CPU)
+# int8        -> <name>_int8.ts published by backend/detection/densenet/quantize.py (CPU)
+BACKENDS = ("eager", "torchscript", "compile", "onnx", "int8")
+
+INFERENCE_BACKEND = os.environ.get("AURAMED_INFERENCE_BACKEND", "eager")
+
+# Memory-map checkpoints on CPU so parameters point straight at the file's
+# page cache. Every worker process loading the same .pth then shares those
+# read-only pages instead of holding its own copy.
+MMAP_WEIGHTS = os.environ.get("AURAMED_MMAP_WEIGHTS", "1") == "1"
+
+ARTIFACT_SUFFIX = {
+    "torchscript": ".ts",
+    "onnx": ".onnx",
+    "int8": "_int8.ts",
+}
+
+
+def artifact_path(weights_path, backend):
+    """Exported artifact next to the .pth file (densenet_xray.pth -> densenet_xray.onnx)."""
+    return os.path.splitext(weights_path)[0] + ARTIFACT_SUFFIX[backend]
+
+
+class OnnxModel:
+    """Callable wrapper so an ONNX Runtime session can stand in for an nn.Module."""
+
+    device = torch.device("cpu")
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        out = self.session.run(None, {self.input_name: x.detach().cpu().numpy().astype(np.float32)})[0]
+        return torch.from_numpy(out).to(x.device)
+
+
+def model_device(model):
+    if isinstance(model, OnnxModel):
+        return model.device
+    try:
+        return next(model.parameters()).device
+    except StopIteration:
+        return torch.device("cpu")
+
+
+def model_nbytes(model, weights_path=None, backend="eager"):
+    if backend in ARTIFACT_SUFFIX and weights_path:
+        # Exported graphs (ONNX sessions, packed int8 params) do not expose
+        # their weights as parameters; the artifact size is a close estimate.
+        # Large ONNX graphs keep their weights in an external <name>.onnx.data file
+        path = artifact_path(weights_path, backend)
+        return sum(os.path.getsize(p) for p in (path, path + ".data") if os.path.exists(p))
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def load_eager(builder, weights_path, device):
+    model = builder()
+    if MMAP_WEIGHTS and device.type == "cpu":
+        state_dict = torch.load(weights_path, map_location="cpu", mmap=True)
+        # assign=True keeps the mmap-backed tensors instead of copying into fresh ones
+        model.load_state_dict(state_dict, assign=True)
+    else:
+        model.load_state_dict(torch.load(weights_path, map_location=device))
+    model.to(device)
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def load_model(builder, weights_path, backend, device):
+    """Build a ready-to-use inference model for the requested backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    if backend == "eager":
+        return load_eager(builder, weights_path, device)
+
+    if backend == "compile":
+        return torch.compile(load_eager(builder, weights_path, device))
+
+    path = artifact_path(weights_path, backend)
+    if not os.path.exists(path):
+        tool = "backend.detection.densenet.quantize" if backend == "int8" else "backend.detection.export"
+        raise FileNotFoundError(f"{backend} artifact not found: {path} (run python -m {tool})")
+
+    if backend == "torchscript":
+        model = torch.jit.load(path, map_location=device)
+        model.eval()
+        return model
+
+    if device.type != "cpu":
+        logger.warning("%s backend runs on CPU only; ignoring device %s", backend, device)
+
+    if backend == "int8":
+        model = torch.jit.load(path, map_location="cpu")
+        model.eval()
+        return model
+
+    return OnnxModel(path)
@@ -0,0 +1,147 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+import torch
+
+from backend.detection.registry import get_registry
+from backend.detection.backends import model_device
+
+logger = logging.getLogger("batcher")
+
+# Dynamic micro-batching knobs
+BATCHING_ENABLED = os.environ.get("AURAMED_BATCHING", "1") == "1"
+BATCH_MAX_SIZE = int(os.environ.get("AURAMED_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("AURAMED_BATCH_MAX_WAIT_MS", "5"))
+
+
+def forward_probs(model, batch):
+    """Softmax probabilities for a stacked (N, C, H, W) batch, returned on CPU."""
+    device = model_device(model)
+    with torch.no_grad():
+        out = model(batch.to(device))
+        return torch.softmax(out, dim=1).cpu()
+
+
+class InferenceBatcher:
+    """
+    Collects pending requests for one registry model and runs them as a
+    single batched forward. A batch is closed when it reaches max_batch_size
+    or when max_wait_ms has passed since its first request arrived.
+    """
+
+    def __init__(self, model_name, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Counters
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = {}  # achieved batch size -> count
+        self.max_achieved = 0
+
+    def submit(self, tensor):
+        """Queue one preprocessed (C, H, W) tensor; the Future resolves to its softmax row."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((tensor, future))
+        return future
+
+    def submit_many(self, tensors):
+        return [self.submit(t) for t in tensors]
+
+    def stats(self):
+        with self._lock:
+            mean = (self.requests / self.batches) if self.batches else 0.0
+            return {
+                "model": self.model_name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(mean, 2),
+                "max_achieved_batch_size": self.max_achieved,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "pending": self._queue.qsize(),
+            }
+
+    # --------------------------------------------------------------
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"batcher-{self.model_name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Window closed: still take whatever is already waiting
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            futures = [f for _, f in batch]
+
+            try:
+                model = get_registry().get(self.model_name)
+                probs = forward_probs(model, torch.stack([t for t, _ in batch]))
+            except Exception as e:
+                logger.error(f"Batched inference failed ({self.model_name}): {e}")
+                for f in futures:
+                    f.set_exception(e)
+                continue
+
+            with self._lock:
+                size = len(batch)
+                self.requests += size
+                self.batches += 1
+                self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+                self.max_achieved = max(self.max_achieved, size)
+
+            for i, f in enumerate(futures):
+                f.set_result(probs[i])
+
+
+# ------------------------------------------------------------------
+# One batcher per registry model
+# ------------------------------------------------------------------
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_name):
+    with _batchers_lock:
+        if model_name not in _batchers:
+            _batchers[model_name] = InferenceBatcher(model_name)
+        return _batchers[model_name]
+
+
+def batcher_stats():
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return {
+        "enabled": BATCHING_ENABLED,
+        "models": [b.stats() for b in batchers],
+    }
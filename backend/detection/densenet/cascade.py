@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+
+import torch.nn.functional as F
+
+from backend.detection.registry import get_registry
+from backend.detection.densenet.batcher import forward_probs
+
+# Cascade: DenseNet at reduced resolution screens every image; only
+# screen probabilities inside [CASCADE_LOW, CASCADE_HIGH] go on to the
+# full 224px model. Keep the band around the 0.9 anomaly cutoff.
+CASCADE_ENABLED = os.environ.get("AURAMED_CASCADE", "0") == "1"
+CASCADE_SCREEN_SIZE = int(os.environ.get("AURAMED_CASCADE_SIZE", "112"))
+CASCADE_LOW = float(os.environ.get("AURAMED_CASCADE_LOW", "0.5"))
+CASCADE_HIGH = float(os.environ.get("AURAMED_CASCADE_HIGH", "0.98"))
+
+
+def downscale(batch, size):
+    """Shrink a preprocessed (N, C, H, W) batch for the screening stage."""
+    return F.interpolate(batch, size=(size, size), mode="bilinear", align_corners=False, antialias=True)
+
+
+class Cascade:
+    """Screen-then-escalate bookkeeping: band, escalation rate and per-stage latency."""
+
+    def __init__(self, screen_size=CASCADE_SCREEN_SIZE, low=CASCADE_LOW, high=CASCADE_HIGH):
+        self.screen_size = screen_size
+        self.low = low
+        self.high = high
+        self._lock = threading.Lock()
+
+        # Counters
+        self.screened = 0
+        self.escalated = 0
+        self.screen_seconds = 0.0
+        self.full_seconds = 0.0
+
+    def should_escalate(self, abnormal_prob):
+        return self.low <= abnormal_prob <= self.high
+
+    def screen(self, model_name, img):
+        """Softmax row of the reduced-resolution forward for one (C, H, W) tensor."""
+        start = time.perf_counter()
+        model = get_registry().get(model_name)
+        prob = forward_probs(model, downscale(img.unsqueeze(0), self.screen_size))[0]
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.screened += 1
+            self.screen_seconds += elapsed
+        return prob
+
+    def record_full(self, seconds):
+        with self._lock:
+            self.escalated += 1
+            self.full_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": CASCADE_ENABLED,
+                "screen_size": self.screen_size,
+                "band": [self.low, self.high],
+                "screened": self.screened,
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / self.screened, 4) if self.screened else 0.0,
+                "screen_ms": round(1000 * self.screen_seconds / self.screened, 2) if self.screened else 0.0,
+                "full_ms": round(1000 * self.full_seconds / self.escalated, 2) if self.escalated else 0.0,
+            }
+
+
+_cascade = None
+_cascade_lock = threading.Lock()
+
+
+def get_cascade():
+    global _cascade
+    with _cascade_lock:
+        if _cascade is None:
+            _cascade = Cascade()
+        return _cascade
+
+
+def cascade_stats():
+    return get_cascade().stats()
@@ -1,43 +1,130 @@
-import torch
-import torchvision.transforms as T
-from PIL import Image
-from backend.detection.densenet.model import load_densenet
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# 🔥 Explicit class mapping (matches ImageFolder alphabetical order)
-CLASS_MAP = {
-    "abnormal": 0,
-    "normal": 1
-}
-
-def predict_image(image_path, model_path):
-    model = load_densenet(num_classes=2)
-    model.load_state_dict(torch.load(model_path, map_location=device))
-    model.to(device)
-    model.eval()
-
-    transform = T.Compose([
-        T.Resize((224,224)),
-        T.Grayscale(num_output_channels=3),
-        T.ToTensor(),
-        T.Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std =[0.229, 0.224, 0.225]
-        )
-    ])
-
-    img = Image.open(image_path).convert("L")
-    img = transform(img).unsqueeze(0).to(device)
-
-    with torch.no_grad():
-        out = model(img)
-        prob = torch.softmax(out, dim=1)[0]
-
-        abnormal_prob = prob[CLASS_MAP["abnormal"]].item()
-        normal_prob   = prob[CLASS_MAP["normal"]].item()
-
-    return {
-        "abnormal": abnormal_prob,
-        "normal": normal_prob
-    }
+import os
+import time
+
+import torch
+import torchvision.transforms as T
+from PIL import Image
+from backend.detection.registry import DENSENET_GRAY, get_registry, densenet_key
+from backend.detection.backends import INFERENCE_BACKEND
+from backend.detection.densenet.batcher import BATCHING_ENABLED, get_batcher, forward_probs
+from backend.detection.densenet.cascade import CASCADE_ENABLED, get_cascade
+from backend.preprocessing.fast import IMAGENET_MEAN, IMAGENET_STD, preprocess_fast
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# 🔥 Explicit class mapping (matches ImageFolder alphabetical order)
+CLASS_MAP = {
+    "abnormal": 0,
+    "normal": 1
+}
+
+transform = T.Compose([
+    T.Resize((224,224)),
+    T.Grayscale(num_output_channels=3),
+    T.ToTensor(),
+    T.Normalize(
+        mean=[0.485, 0.456, 0.406],
+        std =[0.229, 0.224, 0.225]
+    )
+])
+
+# Single-channel stem: normalization is folded into the first conv
+gray_transform = T.Compose([
+    T.Resize((224,224)),
+    T.ToTensor(),
+])
+
+if DENSENET_GRAY:
+    transform = gray_transform
+
+# Reduced-scale JPEG decode + one-pass resize/normalize (scripts/bench_preprocess.py)
+FAST_PREPROCESS = os.environ.get("AURAMED_FAST_PREPROCESS", "1") == "1"
+
+# Test-time augmentation: views scored together in one batched forward
+TTA_ENABLED = os.environ.get("AURAMED_TTA", "0") == "1"
+TTA_VIEWS = ("original", "fliplr", "flipud", "rot90")
+
+def preprocess_image(image_path):
+    """Decode an image into a (3, 224, 224) tensor ready for DenseNet ((1, 224, 224) with the gray stem)."""
+    if FAST_PREPROCESS:
+        if DENSENET_GRAY:
+            return preprocess_fast(image_path, mean=(0.0,), std=(1.0,))
+        return preprocess_fast(image_path, mean=IMAGENET_MEAN, std=IMAGENET_STD)
+    img = Image.open(image_path).convert("L")
+    return transform(img)
+
+def to_result(prob):
+    return {
+        "abnormal": prob[CLASS_MAP["abnormal"]].item(),
+        "normal": prob[CLASS_MAP["normal"]].item()
+    }
+
+def tta_views(img):
+    """Stack the TTA_VIEWS of a (C, H, W) tensor into one (4, C, H, W) batch."""
+    return torch.stack([
+        img,
+        torch.flip(img, dims=[-1]),
+        torch.flip(img, dims=[-2]),
+        torch.rot90(img, 1, dims=[-2, -1]),
+    ])
+
+def classify(name, batch):
+    """Softmax rows for a (N, C, H, W) batch on the full-resolution model."""
+    if BATCHING_ENABLED:
+        # Concurrent callers for the same model share one batched forward;
+        # the TTA views are queued together so they land in the same batch
+        futures = get_batcher(name).submit_many(list(batch))
+        probs = torch.stack([f.result() for f in futures])
+    else:
+        # Resident, eval-mode instance (loaded once by the registry)
+        model = get_registry().get(name)
+        probs = forward_probs(model, batch)
+    return probs
+
+def pipeline_params(tta=None, cascade=None):
+    """Every setting that can change predict_image's output (part of result cache keys)."""
+    tta = TTA_ENABLED if tta is None else tta
+    cascade = CASCADE_ENABLED if cascade is None else cascade
+    params = {
+        "backend": INFERENCE_BACKEND,
+        "gray_stem": DENSENET_GRAY,
+        "fast_preprocess": FAST_PREPROCESS,
+        "tta": tta,
+    }
+    if cascade:
+        stage = get_cascade()
+        params["cascade"] = [stage.screen_size, stage.low, stage.high]
+    return params
+
+def predict_image(image_path, model_path, tta=None, cascade=None):
+    name = densenet_key(model_path)
+    img = preprocess_image(image_path)
+    tta = TTA_ENABLED if tta is None else tta
+    cascade = CASCADE_ENABLED if cascade is None else cascade
+
+    if cascade:
+        # Cheap reduced-resolution screen; confident images stop here
+        stage = get_cascade()
+        screen_prob = stage.screen(name, img)
+        screen_abnormal = screen_prob[CLASS_MAP["abnormal"]].item()
+        if not stage.should_escalate(screen_abnormal):
+            result = to_result(screen_prob)
+            result["stage"] = "screen"
+            return result
+
+    start = time.perf_counter()
+    probs = classify(name, tta_views(img) if tta else img.unsqueeze(0))
+
+    result = to_result(probs.mean(dim=0))
+    if cascade:
+        stage.record_full(time.perf_counter() - start)
+        result["stage"] = "full"
+        result["screen_abnormal"] = screen_abnormal
+    if tta:
+        result["tta"] = {
+            "views": list(TTA_VIEWS),
+            "abnormal": [p[CLASS_MAP["abnormal"]].item() for p in probs],
+            "std": to_result(probs.std(dim=0, unbiased=False)),
+            "range": to_result(probs.max(dim=0).values - probs.min(dim=0).values),
+        }
+    return result
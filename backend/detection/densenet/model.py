@@ -1,15 +1,94 @@
-import torch.nn as nn
-from torchvision.models import densenet121
-
-def load_densenet(num_classes=2):
-    # 🔥 NO PRETRAINED WEIGHTS — RANDOM INITIALIZATION
-    model = densenet121(weights=None)   # or pretrained=False for older versions
-
-    # Replace classifier for your task
-    model.classifier = nn.Linear(
-        model.classifier.in_features,
-        num_classes
-    )
-
-    return model
-
+import os
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torchvision.models import densenet121
+
+# Serve DenseNet with a 1-channel stem fed by plain grayscale [0, 1] tensors
+GRAY_STEM = os.environ.get("AURAMED_GRAY_STEM", "0") == "1"
+
+# Normalization the RGB checkpoints were trained with
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+def load_densenet(num_classes=2):
+    # 🔥 NO PRETRAINED WEIGHTS — RANDOM INITIALIZATION
+    model = densenet121(weights=None)   # or pretrained=False for older versions
+
+    # Replace classifier for your task
+    model.classifier = nn.Linear(
+        model.classifier.in_features,
+        num_classes
+    )
+
+    return model
+
+
+def fold_rgb_stem(weight, mean=IMAGENET_MEAN, std=IMAGENET_STD):
+    """
+    Collapse an RGB conv kernel (out, 3, k, k) that sees a grayscale image
+    replicated to 3 channels and normalized per channel.
+
+    conv(sum_c (g - m_c) / s_c * W_c) = conv(g, sum_c W_c / s_c)
+                                      + conv(1, sum_c -m_c / s_c * W_c)
+
+    Returns (weight, offset), both (out, 1, k, k).
+    """
+    mean = torch.tensor(mean, dtype=weight.dtype).view(1, -1, 1, 1)
+    std = torch.tensor(std, dtype=weight.dtype).view(1, -1, 1, 1)
+    folded = (weight / std).sum(dim=1, keepdim=True)
+    offset = (weight * (-mean / std)).sum(dim=1, keepdim=True)
+    return folded, offset
+
+
+class GrayStem(nn.Module):
+    """
+    Drop-in for DenseNet's conv0 taking one unnormalized grayscale channel.
+
+    The normalization offset is constant, but zero padding happens after
+    normalization in the RGB model, so its contribution differs along the
+    border. It is applied as a bias map conv(ones, offset), cached per
+    input size.
+    """
+
+    def __init__(self, out_channels=64, kernel_size=7, stride=2, padding=3):
+        super().__init__()
+        self.stride = stride
+        self.padding = padding
+        self.weight = nn.Parameter(torch.empty(out_channels, 1, kernel_size, kernel_size))
+        self.register_buffer("offset", torch.zeros(out_channels, 1, kernel_size, kernel_size))
+        nn.init.kaiming_normal_(self.weight)
+        self._bias_maps = {}
+
+    def bias_map(self, height, width, device, dtype):
+        ones = torch.ones(1, 1, height, width, device=device, dtype=dtype)
+        return F.conv2d(ones, self.offset.to(dtype), stride=self.stride, padding=self.padding)
+
+    def forward(self, x):
+        height, width = x.shape[-2:]
+        if torch.jit.is_tracing():
+            # Keep the bias map in the exported graph
+            bias = self.bias_map(height, width, x.device, x.dtype)
+        else:
+            key = (height, width, x.device, x.dtype)
+            bias = self._bias_maps.get(key)
+            if bias is None:
+                bias = self._bias_maps[key] = self.bias_map(height, width, x.device, x.dtype)
+        return F.conv2d(x, self.weight, stride=self.stride, padding=self.padding) + bias
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # RGB checkpoints (densenet_xray.pth / densenet_mri.pth) are converted on load
+        weight = state_dict.get(prefix + "weight")
+        if weight is not None and weight.shape[1] == 3:
+            state_dict[prefix + "weight"], state_dict[prefix + "offset"] = fold_rgb_stem(weight.float())
+        self._bias_maps.clear()
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+
+def load_densenet_gray(num_classes=2):
+    """DenseNet121 with a single-channel GrayStem; loads RGB or gray checkpoints."""
+    model = load_densenet(num_classes)
+    conv0 = model.features.conv0
+    model.features.conv0 = GrayStem(conv0.out_channels, conv0.kernel_size[0], conv0.stride[0], conv0.padding[0])
+    return model
@@ -0,0 +1,117 @@
+"""
+Post-training INT8 quantization for the DenseNet121 classifier (CPU).
+
+    python -m backend.detection.densenet.quantize --dataset xray --mode static
+    python -m backend.detection.densenet.quantize --dataset mri --mode dynamic --tolerance 0.5
+
+static  : FX graph mode, observers calibrated on dataset/<dataset>/val
+dynamic : int8 weights for the Linear classifier only (convs stay fp32)
+
+The quantized model is evaluated on dataset/<dataset>/test with the same
+evaluate() used by train.py and is only published to
+backend/models/densenet_<dataset>_int8.ts if its accuracy is within
+--tolerance percentage points of the fp32 model.
+"""
+import os
+import argparse
+from itertools import islice
+
+import torch
+import torch.nn as nn
+from torchvision import datasets, transforms
+from torch.utils.data import DataLoader
+
+from backend.detection.densenet.model import load_densenet
+from backend.detection.densenet.train import evaluate
+from backend.detection.backends import artifact_path
+
+# Same preprocessing as training, minus the random flip
+eval_transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(
+        mean=[0.485, 0.456, 0.406],
+        std=[0.229, 0.224, 0.225]
+    )
+])
+
+
+def load_fp32(model_path):
+    model = load_densenet(num_classes=2)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    model.eval()
+    return model
+
+
+def quantize_dynamic(model):
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calib_loader, num_batches, engine="x86"):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    torch.backends.quantized.engine = engine
+    example = next(iter(calib_loader))[0]
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (example,))
+
+    # Calibration pass: observers record activation ranges
+    with torch.no_grad():
+        for x, _ in islice(calib_loader, num_batches):
+            prepared(x)
+
+    return convert_fx(prepared)
+
+
+def main(args):
+    torch.backends.quantized.engine = args.engine
+    base_dir = f"dataset/{args.dataset}"
+    model_path = os.path.join(args.models_dir, f"densenet_{args.dataset}.pth")
+    out_path = artifact_path(model_path, "int8")
+
+    val_ds = datasets.ImageFolder(f"{base_dir}/val", transform=eval_transform)
+    test_ds = datasets.ImageFolder(f"{base_dir}/test", transform=eval_transform)
+    val_loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False)
+    test_loader = DataLoader(test_ds, batch_size=args.batch_size, shuffle=False)
+
+    fp32 = load_fp32(model_path)
+
+    if args.mode == "static":
+        print(f"Calibrating on {base_dir}/val ({args.calibration_batches} batches max)...")
+        quantized = quantize_static(load_fp32(model_path), val_loader, args.calibration_batches, args.engine)
+    else:
+        quantized = quantize_dynamic(load_fp32(model_path))
+
+    # 🔥 Accuracy gate on the held-out test split
+    fp32_acc = evaluate(fp32, test_loader, "cpu")
+    int8_acc = evaluate(quantized, test_loader, "cpu")
+    drop = fp32_acc - int8_acc
+
+    print(f"FP32 Test Accuracy: {fp32_acc:.2f}%")
+    print(f"INT8 Test Accuracy: {int8_acc:.2f}% ({args.mode})")
+    print(f"Accuracy drop: {drop:.2f} pts (tolerance {args.tolerance:.2f})")
+
+    if drop > args.tolerance:
+        print("Quantized model REJECTED, nothing published.")
+        return 1
+
+    example = torch.rand(1, 3, 224, 224)
+    with torch.no_grad():
+        scripted = torch.jit.trace(quantized, example)
+    scripted.save(out_path)
+    print(f"Quantized model published -> {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", required=True, choices=["xray", "mri"])
+    parser.add_argument("--mode", default="static", choices=["static", "dynamic"])
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="max allowed accuracy drop in percentage points")
+    parser.add_argument("--calibration-batches", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--engine", default="x86", choices=["x86", "fbgemm", "qnnpack"])
+    parser.add_argument("--models-dir", default="backend/models")
+    args = parser.parse_args()
+    raise SystemExit(main(args))
@@ -0,0 +1,144 @@
+"""
+Export the .pth checkpoints in backend/models/ to TorchScript and ONNX
+artifacts for the inference backends, then check them against eager PyTorch.
+
+    python -m backend.detection.export
+    python -m backend.detection.export --formats onnx --batch-size 8 --runs 50
+"""
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+import torch
+
+from backend.detection.swinunetr.model import get_autoencoder_model
+from backend.detection.registry import DENSENET_INPUT_SHAPE, build_densenet
+from backend.detection.backends import artifact_path, load_eager, load_model
+
+
+def exportable_models(models_dir):
+    """(name, builder, weights_path, input_shape) for every supported checkpoint."""
+    found = []
+    for path in sorted(glob.glob(os.path.join(models_dir, "densenet_*.pth"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        found.append((name, build_densenet, path, DENSENET_INPUT_SHAPE))
+
+    ct_path = os.path.join(models_dir, "ct_autoencoder.pth")
+    if os.path.exists(ct_path):
+        found.append(("ct_autoencoder", lambda: get_autoencoder_model("cpu"), ct_path, (1, 128, 128)))
+    return found
+
+
+def export_torchscript(model, example, path):
+    traced = torch.jit.trace(model, example)
+    traced.save(path)
+
+
+def export_onnx(model, example, path):
+    torch.onnx.export(
+        model,
+        example,
+        path,
+        input_names=["input"],
+        output_names=["output"],
+        # Spatial axes stay dynamic for the reduced-resolution cascade screen
+        dynamic_axes={"input": {0: "batch", 2: "height", 3: "width"}, "output": {0: "batch"}},
+        opset_version=17,
+    )
+
+
+def _time_ms(model, x, runs):
+    with torch.no_grad():
+        model(x)  # warm-up (JIT / allocator / graph capture)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(x)
+            times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def compare_backends(builder, weights_path, input_shape, batch_size=4, runs=20,
+                     backends=("torchscript", "compile", "onnx")):
+    """Parity (max abs diff vs eager) and median latency per backend on the same inputs."""
+    device = torch.device("cpu")
+    torch.manual_seed(0)
+    x = torch.rand(batch_size, *input_shape)
+
+    eager = load_eager(builder, weights_path, device)
+    with torch.no_grad():
+        reference = eager(x)
+
+    rows = [{"backend": "eager", "max_abs_diff": 0.0, "latency_ms": _time_ms(eager, x, runs)}]
+    for backend in backends:
+        try:
+            model = load_model(builder, weights_path, backend, device)
+            with torch.no_grad():
+                out = model(x)
+            diff = (out - reference).abs().max().item()
+            rows.append({"backend": backend, "max_abs_diff": diff, "latency_ms": _time_ms(model, x, runs)})
+        except Exception as e:
+            rows.append({"backend": backend, "error": str(e)})
+    return rows
+
+
+def main(args):
+    models = exportable_models(args.models_dir)
+    if not models:
+        print(f"No checkpoints found in {args.models_dir}")
+        return 1
+
+    failed = False
+    for name, builder, weights_path, input_shape in models:
+        print(f"\n== {name} ({weights_path})")
+        model = load_eager(builder, weights_path, torch.device("cpu"))
+        example = torch.rand(1, *input_shape)
+
+        if "torchscript" in args.formats:
+            path = artifact_path(weights_path, "torchscript")
+            export_torchscript(model, example, path)
+            print(f"TorchScript -> {path}")
+        if "onnx" in args.formats:
+            path = artifact_path(weights_path, "onnx")
+            export_onnx(model, example, path)
+            print(f"ONNX        -> {path}")
+
+        if args.skip_check:
+            continue
+
+        backends = [b for b in ("torchscript", "onnx") if b in args.formats]
+        if args.compile:
+            backends.append("compile")
+        rows = compare_backends(builder, weights_path, input_shape, args.batch_size, args.runs, backends)
+
+        eager_ms = rows[0]["latency_ms"]
+        print(f"{'backend':<12} {'max|diff|':>12} {'latency ms':>11} {'speedup':>8}")
+        for row in rows:
+            if "error" in row:
+                print(f"{row['backend']:<12} unavailable: {row['error']}")
+                continue
+            ok = row["max_abs_diff"] <= args.atol
+            failed |= not ok
+            print(
+                f"{row['backend']:<12} {row['max_abs_diff']:>12.2e} {row['latency_ms']:>11.2f} "
+                f"{eager_ms / row['latency_ms']:>7.2f}x{'' if ok else '  PARITY FAILED'}"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models-dir", default="backend/models")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"],
+                        choices=["torchscript", "onnx"])
+    parser.add_argument("--compile", action="store_true",
+                        help="also benchmark torch.compile (needs a working C++ toolchain)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--skip-check", action="store_true")
+    args = parser.parse_args()
+    raise SystemExit(main(args))
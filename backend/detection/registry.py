@@ -0,0 +1,245 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+import torch
+
+from backend.detection.densenet.model import GRAY_STEM, load_densenet, load_densenet_gray
+from backend.detection.swinunetr.model import get_autoencoder_model
+from backend.detection.backends import INFERENCE_BACKEND, load_model, model_nbytes, model_device
+
+logger = logging.getLogger("registry")
+
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+MODELS_DIR = os.environ.get("AURAMED_MODELS_DIR", "backend/models")
+
+# Upper bound for the weights kept resident (parameters + buffers).
+# Least recently used models are dropped once the budget is exceeded.
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("AURAMED_MODEL_MEMORY_MB", "2048"))
+
+# int8 artifacts are quantized from the RGB model, so they keep the 3-channel stem
+DENSENET_GRAY = GRAY_STEM and INFERENCE_BACKEND != "int8"
+DENSENET_INPUT_SHAPE = (1 if DENSENET_GRAY else 3, 224, 224)
+
+
+def build_densenet():
+    if DENSENET_GRAY:
+        return load_densenet_gray(num_classes=2)
+    return load_densenet(num_classes=2)
+
+
+def _build_swin_autoencoder():
+    # Legacy model definition lives next to the legacy app (models.py)
+    from models import SwinUNETRAutoencoder
+    return SwinUNETRAutoencoder(img_size=(96, 96, 96), in_channels=1, feature_size=24)
+
+
+class ModelSpec:
+    def __init__(self, name, builder, weights_path, backend="eager", example_shape=None):
+        self.name = name
+        self.builder = builder
+        self.weights_path = weights_path
+        self.backend = backend
+        self.example_shape = example_shape  # single input, without batch dim
+
+
+class ModelRegistry:
+    """
+    Loads each model once and keeps it in memory (eval mode, no grad).
+    Resident models are tracked in LRU order under a memory budget.
+    """
+
+    def __init__(self, budget_mb=MODEL_MEMORY_BUDGET_MB, device=DEVICE):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.device = device
+        self._specs = {}
+        self._models = OrderedDict()  # name -> (model, nbytes)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, name, builder, weights_path, backend="eager", example_shape=None):
+        with self._lock:
+            self._specs[name] = ModelSpec(name, builder, weights_path, backend, example_shape)
+            # Re-registering replaces whatever was resident
+            self._models.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def name_for(self, weights_path, builder, prefix, backend="eager", example_shape=None):
+        """Registry name for a checkpoint path (registers it on first use)."""
+        with self._lock:
+            for name, spec in self._specs.items():
+                if os.path.abspath(spec.weights_path) == os.path.abspath(weights_path):
+                    return name
+
+            name = f"{prefix}:{os.path.abspath(weights_path)}"
+            self.register(name, builder, weights_path, backend, example_shape)
+            return name
+
+    def get(self, name):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name][0]
+
+            if name not in self._specs:
+                raise KeyError(f"Unknown model: {name}")
+
+            spec = self._specs[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so hits on other models are not blocked
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+
+            model = self._load(spec)
+
+            with self._lock:
+                self._models[name] = (model, model_nbytes(model, spec.weights_path, spec.backend))
+                self._evict(keep=name)
+            return model
+
+    def preload(self, names=None):
+        """Load every registered model whose weights exist (e.g. before forking workers)."""
+        loaded = []
+        for name in list(names or self._specs):
+            if not os.path.exists(self._specs[name].weights_path):
+                continue
+            try:
+                self.get(name)
+                loaded.append(name)
+            except Exception as e:
+                logger.warning(f"Preload of '{name}' failed: {e}")
+        return loaded
+
+    def warmup(self, name):
+        """Load a model and push one synthetic input through it (JIT / allocator warm-up)."""
+        spec = self._specs[name]
+        model = self.get(name)
+        if spec.example_shape is None:
+            return
+        x = torch.rand(1, *spec.example_shape, device=model_device(model))
+        with torch.no_grad():
+            model(x)
+
+    def weights_paths(self):
+        with self._lock:
+            return [spec.weights_path for spec in self._specs.values()]
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / 2**20, 1),
+                "resident_mb": round(self._resident_bytes() / 2**20, 1),
+                "resident": list(self._models.keys()),
+                "backends": {name: self._specs[name].backend for name in self._models},
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    # --------------------------------------------------------------
+
+    def _load(self, spec):
+        if not os.path.exists(spec.weights_path):
+            raise FileNotFoundError(f"Weights for '{spec.name}' not found: {spec.weights_path}")
+
+        logger.info(f"Loading model '{spec.name}' ({spec.backend}) from {spec.weights_path}")
+        try:
+            model = load_model(spec.builder, spec.weights_path, spec.backend, self.device)
+        except Exception as e:
+            if spec.backend == "eager":
+                raise
+            logger.warning(f"Backend '{spec.backend}' unavailable for '{spec.name}' ({e}); falling back to eager")
+            spec.backend = "eager"
+            model = load_model(spec.builder, spec.weights_path, "eager", self.device)
+
+        with self._lock:
+            self.loads += 1
+        return model
+
+    def _resident_bytes(self):
+        return sum(nbytes for _, nbytes in self._models.values())
+
+    def _evict(self, keep):
+        # Oldest first; never evict the model that was just requested
+        while self._resident_bytes() > self.budget_bytes and len(self._models) > 1:
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            self._models.pop(name)
+            self.evictions += 1
+            logger.info(f"Evicted model '{name}' (memory budget {self.budget_bytes / 2**20:.0f} MB)")
+
+
+def densenet_key(model_path):
+    return get_registry().name_for(
+        model_path, build_densenet, prefix="densenet",
+        backend=INFERENCE_BACKEND, example_shape=DENSENET_INPUT_SHAPE,
+    )
+
+
+# ------------------------------------------------------------------
+# Default registry shared by all apps
+# ------------------------------------------------------------------
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+            _registry.register(
+                "densenet_xray",
+                build_densenet,
+                os.path.join(MODELS_DIR, "densenet_xray.pth"),
+                INFERENCE_BACKEND,
+                example_shape=DENSENET_INPUT_SHAPE,
+            )
+            _registry.register(
+                "densenet_mri",
+                build_densenet,
+                os.path.join(MODELS_DIR, "densenet_mri.pth"),
+                INFERENCE_BACKEND,
+                example_shape=DENSENET_INPUT_SHAPE,
+            )
+            _registry.register(
+                "ct_autoencoder",
+                lambda: get_autoencoder_model("cpu"),
+                os.path.join(MODELS_DIR, "ct_autoencoder.pth"),
+                INFERENCE_BACKEND,
+                example_shape=(1, 128, 128),
+            )
+            _registry.register(
+                "swin_autoencoder",
+                _build_swin_autoencoder,
+                os.environ.get(
+                    "AURAMED_SWIN_AUTOENCODER",
+                    os.path.join(os.getcwd(), "autoencoder_model.pth"),
+                ),
+                example_shape=(1, 96, 96, 96),
+            )
+        return _registry
@@ -0,0 +1,297 @@
+# backend/detection/robust/analyzer.py
+import logging
+
+import numpy as np
+
+from backend.utils.lazy import lazy_import
+from backend.preprocessing.quantiles import percentiles
+from backend.detection.robust.scanner import scan_patches
+
+ndimage = lazy_import("scipy.ndimage")
+
+logger = logging.getLogger("robust")
+
+
+def slice_statistics(img_norm):
+    """
+    Foreground mask, centroid, radial cutoff and IQR thresholds of a slice:
+    everything the patch scan needs besides the pixels themselves.
+    Returns: foreground_mask, (cy, cx), radial_cutoff, thresh_high_stat, thresh_low_stat
+    """
+    h, w = img_norm.shape
+
+    # Calculate Statistical Thresholds (Fallback)
+    foreground_mask = eroded_foreground(img_norm)
+    
+    if np.sum(foreground_mask) == 0: foreground_mask = np.ones_like(foreground_mask, dtype=bool)
+    foreground_pixels = img_norm[foreground_mask]
+    
+    # Radial Filtering Setup (Foreground Centroid)
+    try:
+        y_indices, x_indices = np.where(foreground_mask)
+        if len(y_indices) > 0:
+            cy, cx = np.mean(y_indices), np.mean(x_indices)
+            diff_y = y_indices - cy
+            diff_x = x_indices - cx
+            # Calculate max radius
+            max_radius = np.max(np.sqrt(diff_y**2 + diff_x**2))
+            radial_cutoff = max_radius * 0.90 # 10% Margin for Skull
+        else:
+            cy, cx = h//2, w//2
+            radial_cutoff = min(h,w)//2 * 0.90
+    except:
+        cy, cx = h//2, w//2
+        radial_cutoff = min(h,w)//2 * 0.90
+    
+    if foreground_pixels.size > 0:
+        q25, q50, q75 = percentiles(foreground_pixels, [25, 50, 75])
+    else:
+        q25, q50, q75 = 0, 0, 0
+
+    thresh_high_stat, thresh_low_stat = stat_thresholds(q25, q75)
+    return foreground_mask, (cy, cx), radial_cutoff, thresh_high_stat, thresh_low_stat
+
+
+def eroded_foreground(img_norm):
+    """
+    Tissue mask eroded to remove the skull ring: 8 iterations of a 3x3
+    (8-connected) erosion, i.e. a 17x17 square, done as two separable
+    running minima. Slice-wise on stacks.
+    """
+    foreground_mask = img_norm > 0.05
+    # Erosion to remove skull ring (Increased robustness)
+    return in_plane_box(ndimage.minimum_filter1d, foreground_mask, 2 * 8 + 1)
+
+
+def in_plane_box(filter1d, mask, size):
+    """
+    Binary erosion (minimum_filter1d) or dilation (maximum_filter1d) by a
+    size x size square with a zero border, as two running 1D passes.
+    """
+    mask = filter1d(mask, size, axis=-1, mode="constant", cval=0)
+    return filter1d(mask, size, axis=-2, mode="constant", cval=0)
+
+
+def stat_thresholds(q25, q75):
+    """Statistical-mode (thresh_high_stat, thresh_low_stat) from the foreground quartiles."""
+    iqr = q75 - q25
+    iqr = max(iqr, 0.20) # Clamp for stability
+    
+    # Relaxed Statistical Thresholds
+    # Increased IQR multiplier to 4.5 and Floor to 0.75 to reduce False Positives
+    thresh_high_stat = min(0.99, max(0.75, q75 + (4.5 * iqr))) 
+    thresh_low_stat = max(0.02, q25 - (4.5 * iqr))
+    
+    # --- PHYSICS MODE THRESHOLDS (CT Only) ---
+    # Range -125..225 mapped to 0..1
+    # Liver ~0.53. Tumor ~0.44. Cyst ~0.35. Bone >0.9.
+    # Hypodense Danger Zone: < 0.42
+    # Hyperdense Danger Zone: > 0.88 (raised from 0.60 to ignore Contrast Vessels ~0.7-0.8)
+    # (fixed thresholds live in scanner.py)
+
+    return thresh_high_stat, thresh_low_stat
+
+
+def symmetry_mask(img_norm, foreground_mask):
+    """
+    Bilateral symmetry check: mirrored mask of a focal left/right
+    asymmetry (e.g. a bleed), or None for abdomen-like slices or when
+    there is no focal asymmetry.
+    """
+    h, w = img_norm.shape
+
+    try:
+        com_y, com_x = ndimage.center_of_mass(foreground_mask)
+        center_x = int(com_x)
+    except:
+        center_x = w // 2 # Fallback
+    
+    width_left = center_x
+    width_right = w - center_x
+    min_width = min(width_left, width_right)
+    
+    diff_map = mirrored_difference(img_norm[:, center_x - min_width : center_x],
+                                   img_norm[:, center_x : center_x + min_width])
+    
+    if not is_abdomen(np.mean(diff_map)):
+        asymmetry_roi = focal_roi(diff_map)
+        if is_focal(asymmetry_roi):
+            return mirrored_mask(img_norm, asymmetry_roi, center_x, min_width)
+
+    return None
+
+
+def in_plane(array, value):
+    """Per-axis filter parameter acting within slices only (0 along leading stack axes)."""
+    return (0,) * (array.ndim - 2) + (value, value)
+
+
+def mirrored_difference(left_side, right_side):
+    """
+    Smoothed |mirrored left half - right half|, with the borders and the
+    center line blanked. Works on one slice or a stack of equal-width halves.
+    """
+    left_flipped = left_side[..., ::-1]
+    
+    left_smooth = ndimage.gaussian_filter(left_flipped, sigma=in_plane(left_side, 3.0)) # Reduced sigma for sharper details
+    right_smooth = ndimage.gaussian_filter(right_side, sigma=in_plane(right_side, 3.0))
+    
+    diff_map = np.abs(left_smooth - right_smooth)
+    
+    # Ignore center line artifacts
+    diff_map[..., :10] = 0 
+    diff_map[..., -10:] = 0
+    mid_slice = diff_map.shape[-1] // 2
+    diff_map[..., mid_slice-10 : mid_slice+10] = 0
+    return diff_map
+
+
+def is_abdomen(global_asymmetry):
+    # Check Global Asymmetry (To determine Body Part)
+    # Abdomen has large structural differences
+    abdomen = global_asymmetry > 0.15 # Heuristic: Liver/Spleen create large avg difference
+    logger.info(f"Symmetry Analysis: Global Diff={global_asymmetry:.4f} -> Body Part: {'Abdomen/Torso' if abdomen else 'Head/Symmetric'}")
+    return abdomen
+
+
+def focal_roi(diff_map):
+    """Cleaned asymmetry region of a (stack of) difference map(s)."""
+    # BRAIN MODE: High Sensitivity to Asymmetry (Bleeds)
+    # Bleeds are often 40-60 HU brighter than background. 
+    # Tuning for RawData robustness: Increased diff threshold 0.15 -> 0.20
+    asymmetry_mask = diff_map > 0.20 
+    asymmetry_clean = ndimage.gaussian_filter(asymmetry_mask.astype(float), sigma=in_plane(diff_map, 1.5))
+    asymmetry_roi = asymmetry_clean > 0.4 
+    
+    # --- MORPHOLOGICAL CLEANING (Dust Filter) ---
+    # Remove small scattered noise dots common in RawData
+    # We use binary opening with a 3x3 structure
+    asymmetry_roi = in_plane_box(ndimage.minimum_filter1d, asymmetry_roi, 3)
+    return in_plane_box(ndimage.maximum_filter1d, asymmetry_roi, 3)
+
+
+def is_focal(asymmetry_roi):
+    symmetry_score = np.sum(asymmetry_roi) / asymmetry_roi.size
+    
+    # Filter noise: Anomaly must be significant (>1.5%) but not the whole image
+    # Increased 0.010 -> 0.015 to avoid flagging noisy RawData scans
+    return symmetry_score > 0.015 and symmetry_score < 0.20
+
+
+def mirrored_mask(img_norm, asymmetry_roi, center_x, min_width):
+    full_asym_mask = np.zeros_like(img_norm)
+    full_asym_mask[:, center_x : center_x + min_width] = asymmetry_roi
+    full_asym_mask[:, center_x - min_width : center_x] = np.fliplr(asymmetry_roi)
+    return full_asym_mask
+
+
+def analyze_slice(img_norm, is_ct=False, stats=None, counter=None, symmetry=None):
+    """
+    Revised Analysis Logic:
+    1. Polarity Check: Detects inverted images (White Background) and fixes them.
+    2. Physics Mode (is_ct=True): Uses fixed thresholds for Bone/Air/Soft-Tissue to detect Hypodense tumors.
+    3. Statistical Mode (is_ct=False): Uses robust IQR for unknown modalities.
+    stats (slice_statistics output), counter (scanner.ThresholdCounts) and
+    symmetry ((symmetry_mask output,)) may be passed in when they are already
+    known, e.g. derived from another TTA view.
+    Returns: is_anomaly, confidence, anomaly_mask, max_intensity, anomaly_ratio, analysis_source
+    """
+    h, w = img_norm.shape
+    
+    # --- POLARITY CORRECTION (Universal) ---
+    # Check corners. If corners are bright (>0.5), it's likely an inverted document/image.
+    # We sample 4 corners (5x5 patches).
+    c1 = np.mean(img_norm[0:5, 0:5])
+    c2 = np.mean(img_norm[0:5, w-5:w])
+    c3 = np.mean(img_norm[h-5:h, 0:5])
+    c4 = np.mean(img_norm[h-5:h, w-5:w])
+    corner_avg = (c1 + c2 + c3 + c4) / 4.0
+    
+    # logger.info(f"Polarity Check: Corner Avg={corner_avg:.4f}")
+    
+    # --- POLARITY CORRECTION (Disabled for Stability) ---
+    # User reported issues with "Reversed Polarity". 
+    # We enforce Standard Medical Polarity (Air=Black, Tissue=Bright).
+    # if corner_avg > 0.85:
+    #     logger.info(f"Detected White Background (Corner Avg {corner_avg:.2f}). Inverting polarity for analysis...")
+    #     img_norm = 1.0 - img_norm
+    # ---------------------------------------
+
+    if stats is None:
+        stats = slice_statistics(img_norm)
+    foreground_mask, center, radial_cutoff, thresh_high_stat, thresh_low_stat = stats
+
+    analysis_source = "Robust Analysis"
+
+    # Multi-scale patch scan (32px / 64px), all windows of a scale at once
+    accumulated_mask = scan_patches(img_norm, foreground_mask, is_ct, thresh_high_stat, thresh_low_stat,
+                                    center, radial_cutoff, counter)
+
+    if symmetry is None:
+        symmetry = (symmetry_mask(img_norm, foreground_mask),)
+    full_asym_mask, = symmetry
+
+    return slice_decision(img_norm, is_ct, foreground_mask, accumulated_mask, full_asym_mask, analysis_source)
+
+
+def slice_decision(img_norm, is_ct, foreground_mask, accumulated_mask, full_asym_mask,
+                   analysis_source="Robust Analysis"):
+    """analyze_slice's result from the patch scan and symmetry masks of a slice."""
+    final_mask = accumulated_mask
+    max_intensity = np.max(final_mask) * 100 
+    
+    # Calculate Anomaly Ratio based on refined mask
+    anomaly_pixels = np.sum(final_mask > 0.2)
+    tissue_pixels = np.sum(foreground_mask)
+    if tissue_pixels == 0: tissue_pixels = 1
+    
+    anomaly_ratio = anomaly_pixels / tissue_pixels
+    
+    # --- FILTERS REMOVED: High Sensitivity Mode ---
+    # We prioritize detecting ALL anomalies (Bleeds/Tumors).
+    # Some Skull Artifacts may be flagged (False Positives), but this is safer than missing a Bleed.
+    
+    # --- Enhanced Bilateral Symmetry Analysis ---
+    # Heuristic: Abdomen is naturally asymmetric (Liver vs Spleen). Brain is symmetric.
+    # If the BASE image is highly asymmetric, it's likely Abdomen -> Disable Symmetry Check to avoid False Positives (flagging the whole Liver).
+    # If the BASE image is symmetric, it's likely Head/Lungs -> Enable Symmetry Check for Bleeds/Nodules.
+
+    if full_asym_mask is not None:
+        final_mask = np.maximum(final_mask, full_asym_mask)
+        
+        # REMOVED: max_intensity = max(max_intensity, 90) 
+        # This was forcing "High Intensity" even for low-contrast noise, triggering the alarm.
+        # Now we only update max_intensity if the asymmetric region is ACTUALLY bright.
+        
+        # Calculate intensity of the asymmetric region
+        asym_pixels = img_norm[full_asym_mask > 0]
+        if len(asym_pixels) > 0:
+            # Scale to 0-100 reference (assuming img_norm is 0-1)
+            real_asym_intensity = np.percentile(asym_pixels, 95) * 100 
+            max_intensity = max(max_intensity, real_asym_intensity)
+
+        anomaly_ratio = np.sum(final_mask > 0.1) / final_mask.size
+        analysis_source = "Brain Symmetry Analysis"
+        logger.info("Brain Asymmetry Detected - Injected into Mask")
+
+    if is_ct:
+         # ULTRA-STRICT THRESHOLDS (Global Consensus)
+         # Relaxed 0.015 -> 0.025 and 50 -> 65 to reduce False Positives.
+         # Small bleeds should be caught by the Symmetry/Intensity checks (if confident).
+         is_anomaly = (anomaly_ratio > 0.025) or (max_intensity > 65)
+    else:
+         # Same Strictness for Images
+         is_anomaly = (anomaly_ratio > 0.025) or (max_intensity > 65)
+    
+    if tissue_pixels < 500: is_anomaly = False
+    
+    confidence = 0.0
+    if is_anomaly:
+        extent_score = min(100, anomaly_ratio * 3000) 
+        confidence = (max_intensity * 0.6) + (extent_score * 0.4)
+        confidence = min(99.9, confidence)
+    else:
+        confidence = 95.0 - (anomaly_ratio * 1000)
+        confidence = max(60.0, min(99.0, confidence))
+        
+    return is_anomaly, confidence, final_mask, float(max_intensity), float(anomaly_ratio), analysis_source
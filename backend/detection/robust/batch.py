@@ -0,0 +1,96 @@
+# backend/detection/robust/batch.py
+"""
+Batched robust analysis of a stack of slices (N, H, W).
+
+analyze_slice run on every slice of a stack at once. The erosion, the
+quartiles, the patch scan and the symmetry smoothing are array operations
+over the whole stack: in-plane structures and sigmas (nothing acts along
+the slice axis), per-slice thresholds/centers/cutoffs as arrays, and one
+bincount for all the slices' histograms. Slices sharing a symmetry split
+column are smoothed together. Only the final per-slice decision (a few
+scalars) stays a loop, so results are identical to analyze_slice.
+"""
+import os
+
+import numpy as np
+
+from backend.preprocessing.quantiles import stack_percentiles
+from backend.detection.robust.analyzer import (
+    eroded_foreground, stat_thresholds, mirrored_difference, is_abdomen, focal_roi, is_focal, mirrored_mask, slice_decision,
+)
+from backend.detection.robust.scanner import scan_patches
+
+# Slices analyzed together (bounds the stack temporaries, ~20 float64 planes per slice)
+ROBUST_BATCH = int(os.environ.get("AURAMED_ROBUST_BATCH", "16"))
+
+
+def compared_as(thresholds, dtype):
+    """
+    Per-slice thresholds as a float64 array that compares like the
+    scalars do in analyze_slice: a Python float (a clamped threshold)
+    meets a float32 percentile in float32, a NumPy float64 in float64.
+    """
+    return np.array([float(dtype.type(t)) if type(t) is float else float(t) for t in thresholds])
+
+
+def stack_statistics(stack):
+    """
+    slice_statistics of every slice, as per-slice arrays:
+    foreground (N, H, W), (cy, cx), radial_cutoff, thresh_high_stat, thresh_low_stat
+    """
+    n, h, w = stack.shape
+    foreground = eroded_foreground(stack)
+    foreground[~foreground.any(axis=(1, 2))] = True
+
+    # Centroid from exact integer coordinate sums, like np.mean over np.where
+    tissue = foreground.sum(axis=(1, 2))
+    ys, xs = np.arange(h), np.arange(w)
+    cy = (foreground.sum(axis=2) @ ys) / tissue
+    cx = (foreground.sum(axis=1) @ xs) / tissue
+    radius = np.sqrt((ys[:, None] - cy[:, None, None]) ** 2 + (xs - cx[:, None, None]) ** 2)
+    radial_cutoff = np.where(foreground, radius, -np.inf).max(axis=(1, 2)) * 0.90
+
+    thresholds = [stat_thresholds(q25, q75) for q25, _, q75 in stack_percentiles(stack, foreground, [25, 50, 75])]
+    thresh_high_stat = compared_as([t[0] for t in thresholds], stack.dtype)
+    thresh_low_stat = compared_as([t[1] for t in thresholds], stack.dtype)
+    return foreground, (cy, cx), radial_cutoff, thresh_high_stat, thresh_low_stat
+
+
+def stack_symmetry(stack, foreground):
+    """symmetry_mask of every slice (a list of masks / None)."""
+    n, h, w = stack.shape
+    # int(center_of_mass x), from exact integer sums
+    split = ((foreground.sum(axis=1) @ np.arange(w)) / foreground.sum(axis=(1, 2))).astype(int)
+
+    masks = [None] * n
+    for center_x in np.unique(split):
+        group = np.flatnonzero(split == center_x)
+        min_width = min(center_x, w - center_x)
+        diff_maps = mirrored_difference(stack[group, :, center_x - min_width:center_x],
+                                        stack[group, :, center_x:center_x + min_width])
+        symmetric = [j for j in range(len(group)) if not is_abdomen(np.mean(diff_maps[j]))]
+        if not symmetric:
+            continue
+        for j, roi in zip(symmetric, focal_roi(diff_maps[symmetric])):
+            if is_focal(roi):
+                masks[group[j]] = mirrored_mask(stack[group[j]], roi, center_x, min_width)
+    return masks
+
+
+def analyze_stack(stack, is_ct=False, stats=None, counter=None, symmetry=None):
+    """
+    analyze_slice of every slice of an (N, H, W) stack, as a list of
+    (is_anomaly, confidence, anomaly_mask, max_intensity, anomaly_ratio,
+    analysis_source). stats (stack_statistics output), counter and
+    symmetry (stack_symmetry output) may be passed in when already known.
+    """
+    if stats is None:
+        stats = stack_statistics(stack)
+    foreground, center, radial_cutoff, thresh_high_stat, thresh_low_stat = stats
+
+    accumulated = scan_patches(stack, foreground, is_ct, thresh_high_stat, thresh_low_stat,
+                               center, radial_cutoff, counter)
+    if symmetry is None:
+        symmetry = stack_symmetry(stack, foreground)
+    return [slice_decision(stack[i], is_ct, foreground[i], accumulated[i], symmetry[i])
+            for i in range(len(stack))]
@@ -0,0 +1,125 @@
+# backend/detection/robust/parallel.py
+"""
+Process-parallel slice scan for process_analysis.
+
+The scanned slices of the normalized volume are gathered straight into
+shared memory. A persistent pool of worker processes attaches to them by
+name, runs the batched TTA analysis on chunks of slices and writes each
+slice's anomaly mask straight into a shared output array; only the
+per-slice scalars travel back through the pool, no slice or mask is
+pickled. Masks are copied out one slice at a time as they are yielded.
+
+Workers are spawned rather than forked: the parent may already run
+torch's OpenMP pool, which is not fork-safe. AURAMED_SCAN_WORKERS <= 1
+(the default) keeps the in-process scan.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from backend.utils.shared_array import SharedArray
+from backend.detection.robust.phantoms import volume_phantom
+from backend.detection.robust.tta import tta_consensus_slices
+
+# Worker processes for the volume slice scan, and slices per task
+SCAN_WORKERS = int(os.environ.get("AURAMED_SCAN_WORKERS", "0"))
+SCAN_CHUNK = int(os.environ.get("AURAMED_SCAN_CHUNK", "4"))
+
+logger = logging.getLogger("robust")
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_scan_pool(workers=SCAN_WORKERS):
+    """Persistent process pool with `workers` workers (created on first use)."""
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+        return _pools[workers]
+
+
+def shutdown_scan_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _discard_pool(workers):
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_chunk(slices_spec, masks_spec, start, stop, is_ct):
+    """Worker task: analyze slices[start:stop] and write their masks into masks[start:stop]."""
+    slices, masks = SharedArray.attach(slices_spec), SharedArray.attach(masks_spec)
+    try:
+        results = []
+        for pos, (original, avg_ratio, avg_max_int) in tta_consensus_slices(slices.array, range(start, stop),
+                                                                           is_ct, batch=stop - start):
+            is_anom, conf, mask, max_int, ratio, src = original
+            masks.array[pos] = mask
+            results.append((is_anom, conf, max_int, ratio, src, avg_ratio, avg_max_int))
+        return results
+    finally:
+        slices.close()
+        masks.close()
+
+
+def _scan_parallel(volume, indices, is_ct, workers, chunk):
+    """Yields (index, tta_consensus(volume[index])) for the given slice indices, computed by the pool."""
+    pool = get_scan_pool(workers)
+    n = len(indices)
+    with SharedArray((n,) + volume.shape[1:], volume.dtype) as slices, SharedArray(slices.array.shape, volume.dtype) as masks:
+        # Gathered in place (mode="raise" would buffer the output); indices are in range
+        np.take(volume, indices, axis=0, out=slices.array, mode="clip")
+        futures = [pool.submit(_scan_chunk, slices.spec, masks.spec, start, min(start + chunk, n), is_ct)
+                   for start in range(0, n, chunk)]
+        try:
+            results = [r for future in futures for r in future.result()]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        # Each mask is copied out as it is yielded: no view of the block outlives it
+        for i, (is_anom, conf, max_int, ratio, src, avg_ratio, avg_max_int) in enumerate(results):
+            yield indices[i], ((is_anom, conf, masks.array[i].copy(), max_int, ratio, src), avg_ratio, avg_max_int)
+
+
+def scan_slices(volume, indices, is_ct=False, workers=SCAN_WORKERS, chunk=SCAN_CHUNK):
+    """
+    Yields (index, tta_consensus(volume[index])) for the given slice
+    indices, like tta_consensus_slices, spreading the slices over
+    `workers` processes (chunk slices per task) when workers > 1.
+    """
+    indices = list(indices)
+    if workers <= 1 or len(indices) <= chunk:
+        yield from tta_consensus_slices(volume, indices, is_ct)
+        return
+
+    try:
+        # A broken pool surfaces while collecting the results, before anything is yielded
+        yield from _scan_parallel(volume, indices, is_ct, workers, chunk)
+    except BrokenProcessPool as e:
+        logger.warning(f"Parallel slice scan unavailable ({e}); scanning in-process")
+        _discard_pool(workers)
+        yield from tta_consensus_slices(volume, indices, is_ct)
+
+
+def warm_scan_pool(workers=SCAN_WORKERS):
+    """Start the workers (spawn + scipy imports) before the first volume arrives."""
+    if workers <= 1:
+        return
+    phantom = volume_phantom(depth=2 * workers, size=64)
+    for _ in scan_slices(phantom, range(len(phantom)), workers=workers, chunk=1):
+        pass
@@ -0,0 +1,48 @@
+# backend/detection/robust/phantoms.py
+"""
+Synthetic normalized slices/volumes for warm-up, benchmarks and parity
+checks of the robust analyzer. Values are in [0, 1] like the analyzer's
+inputs: CT phantoms follow the soft-tissue window (liver ~0.53), the
+others look like a head slice (skull ring, brain, focal lesions).
+"""
+import numpy as np
+
+
+def _disk(yy, xx, cy, cx, r):
+    return (yy - cy) ** 2 + (xx - cx) ** 2 < r ** 2
+
+
+def slice_phantom(size=224, is_ct=False, seed=0, lesions=2, dtype=np.float64):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:size, :size].astype(np.float64)
+    c = size / 2
+    img = np.zeros((size, size))
+
+    if is_ct:
+        # Body, liver and a spine-like bone block
+        img[_disk(yy, xx, c, c, size * 0.45)] = 0.35
+        img[_disk(yy, xx, c - size * 0.05, c - size * 0.12, size * 0.25)] = 0.53
+        img[_disk(yy, xx, c + size * 0.3, c, size * 0.06)] = 0.95
+        lesion_values = (0.4, 0.3)
+    else:
+        img[_disk(yy, xx, c, c, size * 0.44)] = 0.9   # skull ring
+        img[_disk(yy, xx, c, c, size * 0.40)] = 0.45  # brain
+        lesion_values = (0.98, 0.15)
+
+    for i in range(lesions):
+        cy = c + rng.uniform(-0.2, 0.2) * size
+        cx = c + rng.uniform(-0.2, 0.2) * size
+        r = rng.uniform(0.04, 0.08) * size
+        img[_disk(yy, xx, cy, cx, r)] = lesion_values[i % 2]
+
+    img += rng.normal(0, 0.02, img.shape)
+    return np.clip(img, 0, 1).astype(dtype)
+
+
+def volume_phantom(depth=60, size=224, is_ct=False, seed=0, dtype=np.float32):
+    """(depth, size, size) stack with lesions appearing on some slices."""
+    rng = np.random.default_rng(seed)
+    return np.stack([
+        slice_phantom(size, is_ct, seed=seed * 1000 + z, lesions=int(rng.integers(0, 3)), dtype=dtype)
+        for z in range(depth)
+    ])
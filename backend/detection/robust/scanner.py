@@ -0,0 +1,267 @@
+# backend/detection/robust/scanner.py
+"""
+Vectorized multi-scale patch scan of the robust slice analyzer.
+
+Same windows, thresholds and floating point operations as the original
+per-patch loop, so masks and scores are identical, but every window of a
+scale is handled at once:
+- foreground fractions from box sums (cell sums or a summed-area table)
+- the masked 80th percentile compared with each decision threshold by
+  counting foreground pixels above it, with an exact per-window
+  percentile only where the comparison is too close to call
+- the max-splat of anomalous windows as a neighbourhood max over cells
+
+Everything also accepts a stack of slices (..., H, W): windows never cross
+slices, and the statistical thresholds, center and radial cutoff may then
+be per-slice arrays.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PATCH_SIZES = (32, 64)
+STRIDE_RATIOS = (0.5, 0.5)
+SCALE_WEIGHTS = (1.0, 0.8)
+
+# Minimum foreground fraction for a window to be scored
+MIN_FOREGROUND = 0.3
+PATCH_PERCENTILE = 80
+
+# Physics mode (CT, window -125..225 mapped to 0..1)
+CT_SKIP_ABOVE = 0.9      # bone / metal
+CT_DARK_RANGE = (0.25, 0.48)  # hypodense lesions, above fat/air
+CT_BRIGHT_ABOVE = 0.88   # above contrast vessels (~0.7-0.8)
+STAT_DARK_FLOOR = 0.1
+
+HIGH_SCORE = min(1.0, 50 / 60.0)
+LOW_SCORE = min(1.0, 40 / 60.0)
+
+
+def window_origins(length, size, stride):
+    return np.arange(0, length - size + 1, stride)
+
+
+def per_slice(value):
+    """Scalar, or per-slice array broadcast against (..., rows, cols)."""
+    return np.reshape(value, np.shape(value) + (1, 1)) if np.ndim(value) else value
+
+
+def summed_area_table(mask):
+    """Zero-padded 2D prefix sums: sat[..., y, x] = mask[..., :y, :x].sum()."""
+    *lead, h, w = mask.shape
+    sat = np.zeros((*lead, h + 1, w + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(mask, axis=-2, dtype=np.int64), axis=-1, out=sat[..., 1:, 1:])
+    return sat
+
+
+def window_counts(mask, size, stride):
+    """
+    True pixels in every size x size window of the scan grid, as a
+    (..., rows, cols) array. When stride divides size the windows are
+    unions of stride x stride cells, so the counts are cell sums added up
+    over k x k neighbourhoods; otherwise they come from a summed-area table.
+    """
+    *lead, h, w = mask.shape
+    ys, xs = window_origins(h, size, stride), window_origins(w, size, stride)
+    if len(ys) == 0 or len(xs) == 0:
+        return np.zeros((*lead, len(ys), len(xs)), dtype=np.int64)
+
+    if size % stride == 0:
+        k = size // stride
+        ny, nx = len(ys) + k - 1, len(xs) + k - 1
+        # Rows first (contiguous reduce over a uint8 view), then columns
+        cells = mask[..., :ny * stride, :nx * stride].view(np.uint8).reshape(*lead, ny, stride, nx * stride)
+        cells = cells.sum(axis=-2, dtype=np.int32).reshape(*lead, ny, nx, stride).sum(axis=-1, dtype=np.int64)
+        return sliding_window_view(cells, (k, k), axis=(-2, -1)).sum(axis=(-2, -1))
+
+    sat = summed_area_table(mask)
+    y0, x0 = ys[:, None], xs[None, :]
+    y1, x1 = y0 + size, x0 + size
+    return sat[..., y1, x1] - sat[..., y0, x1] - sat[..., y1, x0] + sat[..., y0, x0]
+
+
+def percentile_ranks(n, q):
+    """
+    Sorted positions np.percentile interpolates between for samples of n
+    values, and the interpolation weight (numpy's linear method).
+    """
+    virtual = (n - 1) * (q / 100)
+    below = np.floor(virtual).astype(np.intp)
+    above = below + 1
+    gamma = virtual - below
+    last = virtual >= n - 1
+    below[last] = above[last] = n[last] - 1
+    return below, above, gamma
+
+
+def masked_percentile(values, valid, q):
+    """
+    np.percentile(row[valid_row], q) for every row of values, reproducing
+    numpy's linear method bit for bit (same virtual index and lerp).
+    Rows must have at least one valid element.
+    """
+    n = valid.sum(axis=1)
+    below, above, gamma = percentile_ranks(n, q)
+    # Invalid entries sort after every valid one
+    filled = np.where(valid, values, np.inf)
+
+    a = np.empty(len(n), dtype=values.dtype)
+    b = np.empty(len(n), dtype=values.dtype)
+    # One partition per distinct valid count; full windows are the common case
+    for count in np.unique(n):
+        rows = np.flatnonzero(n == count)
+        lo, hi = below[rows[0]], above[rows[0]]
+        part = np.partition(filled[rows], np.unique([lo, hi]), axis=1)
+        a[rows] = part[:, lo]
+        b[rows] = part[:, hi]
+
+    # numpy's _lerp, with the weight cast like a scalar q would be
+    diff = b - a
+    t = gamma.astype(values.dtype)
+    u = (1 - gamma).astype(values.dtype)
+    return np.where(gamma >= 0.5, b - diff * u, a + diff * t)
+
+
+def max_splat(scores, size, stride, shape, dtype):
+    """
+    Mask where every pixel holds the max score of the windows covering it,
+    i.e. np.maximum(mask[y:y+size, x:x+size], score) applied for every window.
+    """
+    mask = np.zeros(shape, dtype=dtype)
+    *lead, ny, nx = scores.shape
+    if ny == 0 or nx == 0:
+        return mask
+
+    if size % stride:
+        for index in zip(*np.nonzero(scores)):
+            *at, i, j = index
+            y, x = i * stride, j * stride
+            region = mask[(*at, slice(y, y + size), slice(x, x + size))]
+            np.maximum(region, scores[index], out=region)
+        return mask
+
+    # stride x stride cells; cell i is covered by windows i-k+1 .. i
+    k = size // stride
+    padded = np.zeros((*lead, ny + 2 * (k - 1), nx + 2 * (k - 1)), dtype=scores.dtype)
+    padded[..., k - 1:k - 1 + ny, k - 1:k - 1 + nx] = scores
+    cells = sliding_window_view(padded, (k, k), axis=(-2, -1)).max(axis=(-2, -1))
+    rows, cols = cells.shape[-2] * stride, cells.shape[-1] * stride
+    mask[..., :rows, :cols] = np.repeat(np.repeat(cells, stride, axis=-2), stride, axis=-1)
+    return mask
+
+
+def decision_thresholds(is_ct, thresh_high_stat, thresh_low_stat):
+    """Decision thresholds by role; the statistical ones may be per-slice arrays."""
+    if is_ct:
+        return {"skip": CT_SKIP_ABOVE, "dark_high": CT_DARK_RANGE[1],
+                "dark_low": CT_DARK_RANGE[0], "bright": CT_BRIGHT_ABOVE}
+    return {"high": thresh_high_stat, "low": thresh_low_stat, "floor": STAT_DARK_FLOOR}
+
+
+def score_windows(gt, lt, is_ct):
+    """
+    Window scores (0 = not anomalous). gt(role) / lt(role) say which
+    windows have their 80th percentile above / below that threshold.
+    """
+    if is_ct:
+        dark = lt("dark_high") & gt("dark_low")
+        hit = ~gt("skip") & (dark | gt("bright"))
+        return np.where(hit, HIGH_SCORE, 0.0)
+    high = gt("high")
+    low = ~high & lt("low") & gt("floor")
+    return np.where(high, HIGH_SCORE, np.where(low, LOW_SCORE, 0.0))
+
+
+class ThresholdCounts:
+    """
+    Per-threshold foreground indicators, shared by both scales: counting
+    in each window how many foreground pixels lie above T +/- eps decides
+    "80th percentile > T" for every window from box sums alone. Only the
+    windows whose percentile falls (within rounding) on a threshold are
+    left undecided and computed exactly.
+    """
+
+    def __init__(self, img_norm, foreground_mask, thresholds):
+        # Covers the rounding of numpy's lerp between two order statistics
+        scale = max(1.0, float(np.abs(img_norm).max())) if img_norm.size else 1.0
+        eps = 8 * np.finfo(img_norm.dtype).eps * scale
+        self.indicators = {
+            role: (foreground_mask & (img_norm > per_slice(t) + eps), foreground_mask & (img_norm > per_slice(t) - eps))
+            for role, t in thresholds.items()
+        }
+
+    def decide(self, size, stride, select, below, above, n):
+        """(gt, undecided) for the selected windows of one scale."""
+        gt, undecided = {}, np.zeros(len(n), dtype=bool)
+        for role, (over, near) in self.indicators.items():
+            # x[below] > t + eps  <=>  at least n - below pixels above t + eps
+            certainly_above = window_counts(over, size, stride)[select] >= n - below
+            # x[above] <= t - eps  <=>  at most n - 1 - above pixels above t - eps
+            certainly_below = window_counts(near, size, stride)[select] <= n - 1 - above
+            gt[role] = certainly_above
+            undecided |= ~(certainly_above | certainly_below)
+        return gt, undecided
+
+    def transformed(self, fn):
+        """Counts for a flipped/rotated view of the slice: indicators are transformed, not recomputed."""
+        other = object.__new__(ThresholdCounts)
+        other.indicators = {role: (fn(over), fn(near)) for role, (over, near) in self.indicators.items()}
+        return other
+
+
+def scan_scale(img_norm, foreground_mask, counter, size, stride, is_ct,
+               thresh_high_stat, thresh_low_stat, center, radial_cutoff):
+    """scale_mask of one patch size."""
+    *lead, h, w = img_norm.shape
+    ys, xs = window_origins(h, size, stride), window_origins(w, size, stride)
+    grid = np.zeros((*lead, len(ys), len(xs)), dtype=np.float64)
+    if grid.size == 0:
+        return max_splat(grid, size, stride, img_norm.shape, img_norm.dtype)
+
+    counts = window_counts(foreground_mask, size, stride)
+    candidates = counts >= size * size * MIN_FOREGROUND
+    if not is_ct:
+        # Radial filter: ignore edge artifacts (skull ring)
+        cy, cx = (per_slice(c) for c in center)
+        pcy, pcx = ys[:, None] + size // 2, xs[None, :] + size // 2
+        candidates &= np.sqrt((pcy - cy) ** 2 + (pcx - cx) ** 2) <= per_slice(radial_cutoff)
+
+    select = np.nonzero(candidates)
+    if len(select[0]) == 0:
+        return max_splat(grid, size, stride, img_norm.shape, img_norm.dtype)
+
+    n = counts[select]
+    below, above, _ = percentile_ranks(n, PATCH_PERCENTILE)
+    known, undecided = counter.decide(size, stride, select, below, above, n)
+    scores = score_windows(lambda r: known[r], lambda r: ~known[r], is_ct)
+
+    exact = np.flatnonzero(undecided)
+    if len(exact):
+        windows = sliding_window_view(img_norm, (size, size), axis=(-2, -1))[..., ::stride, ::stride, :, :]
+        masks = sliding_window_view(foreground_mask, (size, size), axis=(-2, -1))[..., ::stride, ::stride, :, :]
+        at = tuple(axis[exact] for axis in select)
+        values = masked_percentile(windows[at].reshape(len(exact), -1),
+                                   masks[at].reshape(len(exact), -1), PATCH_PERCENTILE)
+        # Per-slice thresholds are looked up for each window's slice
+        thresholds = {role: t[at[0]] if np.ndim(t) else t
+                      for role, t in decision_thresholds(is_ct, thresh_high_stat, thresh_low_stat).items()}
+        scores[exact] = score_windows(lambda r: values > thresholds[r], lambda r: values < thresholds[r], is_ct)
+
+    grid[select] = scores
+    return max_splat(grid, size, stride, img_norm.shape, img_norm.dtype)
+
+
+def threshold_counts(img_norm, foreground_mask, is_ct, thresh_high_stat, thresh_low_stat):
+    return ThresholdCounts(img_norm, foreground_mask, decision_thresholds(is_ct, thresh_high_stat, thresh_low_stat))
+
+
+def scan_patches(img_norm, foreground_mask, is_ct, thresh_high_stat, thresh_low_stat,
+                 center, radial_cutoff, counter=None):
+    """Weighted sum of the per-scale anomaly masks (the analyzer's accumulated_mask)."""
+    if counter is None:
+        counter = threshold_counts(img_norm, foreground_mask, is_ct, thresh_high_stat, thresh_low_stat)
+    accumulated_mask = np.zeros_like(img_norm)
+    for size, ratio, weight in zip(PATCH_SIZES, STRIDE_RATIOS, SCALE_WEIGHTS):
+        scale_mask = scan_scale(img_norm, foreground_mask, counter, size, int(size * ratio), is_ct,
+                                thresh_high_stat, thresh_low_stat, center, radial_cutoff)
+        accumulated_mask += scale_mask * weight
+    return accumulated_mask
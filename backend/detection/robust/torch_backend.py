@@ -0,0 +1,423 @@
+# backend/detection/robust/torch_backend.py
+"""
+Torch implementation of the robust slice analyzer, for whole slice
+batches on torch's intra-op thread pool (AURAMED_ROBUST_TORCH_THREADS).
+
+Same pipeline as analyzer.py / batch.py, written with tensor ops:
+- erosion and opening as separable running window counts of
+  zero-padded masks
+- Gaussian smoothing as separable symmetric taps with scipy's kernel
+  (truncate 4), 'reflect' borders and float64 accumulation
+- foreground quartiles from one bincount over all slices, binned like
+  preprocessing.quantiles
+- window foreground / threshold counts by average pooling, deciding the
+  80th percentile tests like scanner.ThresholdCounts; the undecided
+  windows get exact percentiles from F.unfold patches
+- max-splat of the window scores as max-pooling over stride cells
+analyze_stack_views shares the view-invariant work across the TTA views
+like tta.analyze_stack_views, and scans the views as one batch.
+The per-slice decision is analyzer.slice_decision. Operation order
+follows the NumPy/scipy path, so results match it
+(scripts/parity_torch_analyzer.py); torch kernels are free to vectorize
+differently, hence a parity check rather than a guarantee.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from backend.utils.lazy import lazy_import
+from backend.preprocessing.quantiles import Histogram, QUANTILE_BINS
+from backend.detection.robust.analyzer import stat_thresholds, is_abdomen, is_focal, mirrored_mask, slice_decision
+from backend.detection.robust.batch import compared_as
+from backend.detection.robust.scanner import (
+    PATCH_SIZES, STRIDE_RATIOS, SCALE_WEIGHTS, MIN_FOREGROUND, PATCH_PERCENTILE,
+    window_origins, percentile_ranks, decision_thresholds, score_windows,
+)
+from backend.detection.robust.tta import TTA_VIEWS, view, view_center
+
+torch = lazy_import("torch")
+F = lazy_import("torch.nn.functional")
+ndimage = lazy_import("scipy.ndimage")
+
+# Intra-op threads for the torch analyzer (0: leave torch's default).
+# torch's thread count is process-wide: while an analysis runs, other torch
+# work in the process (DenseNet inference) uses this count too.
+ROBUST_TORCH_THREADS = int(os.environ.get("AURAMED_ROBUST_TORCH_THREADS", "0"))
+# Patch pixels unfolded at once (bounds the exact-percentile temporaries)
+UNFOLD_BUDGET = 1 << 24
+
+_threads_lock = threading.Lock()
+_threads_users = 0
+_threads_previous = None
+
+
+@contextmanager
+def robust_threads():
+    """
+    ROBUST_TORCH_THREADS while analyses are running; the previous thread
+    count is restored when the last concurrent analysis finishes.
+    """
+    global _threads_users, _threads_previous
+    if ROBUST_TORCH_THREADS <= 0:
+        yield
+        return
+    with _threads_lock:
+        if _threads_users == 0:
+            _threads_previous = torch.get_num_threads()
+            torch.set_num_threads(ROBUST_TORCH_THREADS)
+        _threads_users += 1
+    try:
+        yield
+    finally:
+        with _threads_lock:
+            _threads_users -= 1
+            if _threads_users == 0:
+                torch.set_num_threads(_threads_previous)
+
+
+def _line_counts(x, size, dim):
+    """Sums of size-long windows centered on each element along dim (zero outside), from a cumsum."""
+    r = size // 2
+    lines = x.movedim(dim, -1)
+    n = lines.shape[-1]
+    cumulative = F.pad(lines, (r + 1, r)).cumsum(-1)
+    return (cumulative[..., size:size + n] - cumulative[..., :n]).movedim(-1, dim)
+
+
+def box_morphology(mask, size, erode):
+    """Binary erosion (or dilation) of an (N, H, W) bool mask by a size x size square, zero border."""
+    x = mask.to(torch.int32)
+    for dim in (-1, -2):
+        counts = _line_counts(x, size, dim)
+        x = (counts == size if erode else counts > 0).to(torch.int32)
+    return x.bool()
+
+
+def _reflect_index(n, radius):
+    """scipy 'reflect' (d c b a | a b c d | d c b a) padding as a gather index."""
+    idx = np.mod(np.arange(-radius, n + radius), 2 * n)
+    return torch.from_numpy(np.where(idx >= n, 2 * n - 1 - idx, idx))
+
+
+def gaussian_smooth(x, sigma):
+    """
+    ndimage.gaussian_filter over the last two axes (rows, then columns),
+    in float64 and rounded to x's dtype after each pass like scipy.
+    """
+    radius = int(4.0 * sigma + 0.5)
+    taps = np.exp(-0.5 / (sigma * sigma) * np.arange(-radius, radius + 1) ** 2)
+    weights = (taps / taps.sum())[radius:].tolist()
+    out = x
+    for dim in (x.dim() - 2, x.dim() - 1):
+        n = out.shape[dim]
+        padded = out.to(torch.float64).index_select(dim, _reflect_index(n, radius))
+        # Symmetric kernel: center tap, then mirrored pairs from the outside in (scipy's order)
+        smoothed = padded.narrow(dim, radius, n) * weights[0]
+        pair = torch.empty_like(smoothed)
+        for j in range(radius, 0, -1):
+            torch.add(padded.narrow(dim, radius - j, n), padded.narrow(dim, radius + j, n), out=pair)
+            smoothed += pair.mul_(weights[j])
+        out = smoothed.to(x.dtype)
+    return out
+
+
+def masked_percentile(values, valid, q):
+    """scanner.masked_percentile on tensors: np.percentile of each row's valid entries."""
+    n = valid.sum(dim=1)
+    virtual = (n - 1).to(torch.float64) * (q / 100)
+    below = torch.floor(virtual).long()
+    above = below + 1
+    gamma = virtual - below
+    last = virtual >= n - 1
+    below[last] = above[last] = n[last] - 1
+
+    ordered = values.masked_fill(~valid, float("inf")).sort(dim=1).values
+    a = ordered.gather(1, below[:, None])[:, 0]
+    b = ordered.gather(1, above[:, None])[:, 0]
+    diff = b - a
+    t = gamma.to(values.dtype)
+    u = (1 - gamma).to(values.dtype)
+    return torch.where(gamma >= 0.5, b - diff * u, a + diff * t)
+
+
+def stack_quartiles(img, foreground, bins=QUANTILE_BINS):
+    """Foreground quartiles per slice, same bins and arithmetic as quantiles.stack_percentiles."""
+    n = len(img)
+    flat, mask = img.reshape(n, -1), foreground.reshape(n, -1)
+    lo = flat.masked_fill(~mask, float("inf")).amin(dim=1)
+    hi = flat.masked_fill(~mask, float("-inf")).amax(dim=1)
+    hists = [Histogram(l, h, bins) for l, h in zip(lo.tolist(), hi.tolist())]
+
+    scale = torch.tensor([1.0 / hist.width for hist in hists], dtype=torch.float64).to(img.dtype)
+    rows = torch.arange(n).repeat_interleave(mask.sum(dim=1))
+    idx = ((flat[mask] - lo[rows]) * scale[rows]).long().clamp_(0, bins - 1)
+    counts = torch.bincount(rows * bins + idx, minlength=n * bins).view(n, bins).numpy()
+    for hist, row in zip(hists, counts):
+        hist.counts = row
+    return np.array([hist.percentile([25, 50, 75]) for hist in hists])
+
+
+def stack_statistics(img):
+    """batch.stack_statistics on a tensor stack (foreground stays a tensor)."""
+    n, h, w = img.shape
+    foreground = box_morphology(img > 0.05, 2 * 8 + 1, erode=True)
+    foreground[~foreground.flatten(1).any(dim=1)] = True
+
+    tissue = foreground.sum(dim=(1, 2)).to(torch.float64)
+    ys = torch.arange(h, dtype=torch.float64)
+    xs = torch.arange(w, dtype=torch.float64)
+    cy = (foreground.sum(dim=2).to(torch.float64) @ ys) / tissue
+    cx = (foreground.sum(dim=1).to(torch.float64) @ xs) / tissue
+
+    # Farthest foreground pixel of each row is its first or last one
+    has = foreground.any(dim=2)
+    first = foreground.to(torch.uint8).argmax(dim=2).to(torch.float64)
+    last = (w - 1) - foreground.flip(2).to(torch.uint8).argmax(dim=2).to(torch.float64)
+    dx2 = torch.maximum((first - cx[:, None]) ** 2, (last - cx[:, None]) ** 2)
+    dist2 = ((ys - cy[:, None]) ** 2 + dx2).masked_fill(~has, float("-inf"))
+    radial_cutoff = torch.sqrt(dist2.amax(dim=1)).numpy() * 0.90
+
+    dtype = img.numpy().dtype
+    thresholds = [stat_thresholds(q25, q75) for q25, _, q75 in stack_quartiles(img, foreground)]
+    thresh_high_stat = compared_as([t[0] for t in thresholds], dtype)
+    thresh_low_stat = compared_as([t[1] for t in thresholds], dtype)
+    return foreground, (cy.numpy(), cx.numpy()), radial_cutoff, thresh_high_stat, thresh_low_stat
+
+
+def max_splat(grid, size, stride, shape, dtype):
+    """scanner.max_splat on an (N, rows, cols) score tensor."""
+    mask = torch.zeros(shape, dtype=dtype)
+    n, ny, nx = grid.shape
+    if ny == 0 or nx == 0:
+        return mask
+    if size % stride:
+        for s, i, j in torch.nonzero(grid).tolist():
+            y, x = i * stride, j * stride
+            region = mask[s, y:y + size, x:x + size]
+            torch.maximum(region, grid[s, i, j].to(dtype), out=region)
+        return mask
+
+    k = size // stride
+    cells = F.max_pool2d(F.pad(grid[:, None], (k - 1, k - 1, k - 1, k - 1)), k, stride=1)[:, 0]
+    cells = cells.repeat_interleave(stride, dim=1).repeat_interleave(stride, dim=2)
+    mask[:, :cells.shape[1], :cells.shape[2]] = cells.to(dtype)
+    return mask
+
+
+def window_counts(masks, size, stride):
+    """
+    True pixels in every size x size window of the scan grid for each
+    channel of an (N, C, H, W) mask stack, as (N, C, rows, cols) int64:
+    stride x stride cell sums, then k x k sums of cells when stride
+    divides size (float32 sums of small integers are exact).
+    """
+    x = masks.to(torch.float32)
+    if size % stride == 0:
+        k = size // stride
+        cells = F.avg_pool2d(x, stride, stride) * (stride * stride)
+        return torch.round(F.avg_pool2d(cells, k, 1) * (k * k)).long()
+    return torch.round(F.avg_pool2d(x, size, stride) * (size * size)).long()
+
+
+def threshold_indicators(img, foreground, thresholds):
+    """
+    scanner.ThresholdCounts indicators as one (N, 2 * roles, H, W) stack:
+    foreground pixels above each threshold + eps, then - eps. Thresholds
+    are rounded to the slice dtype, well inside the 8 ulp margin.
+    """
+    scale = max(1.0, float(img.abs().max())) if img.numel() else 1.0
+    eps = 8 * np.finfo(img.numpy().dtype).eps * scale
+    channels = []
+    for t in thresholds.values():
+        t = np.asarray(t, dtype=np.float64).reshape(-1, 1, 1)
+        for shifted in (t + eps, t - eps):
+            channels.append(foreground & (img > torch.from_numpy(shifted).to(img.dtype)))
+    return torch.stack(channels, dim=1)
+
+
+def exact_percentiles(img, foreground, size, stride, select, ncols):
+    """Masked 80th percentile of the selected windows, from unfolded patches a few slices at a time."""
+    values = torch.empty(len(select[0]), dtype=img.dtype)
+    per_step = max(1, UNFOLD_BUDGET // (size * size * max(1, ncols) * max(1, img.shape[1] // stride)))
+    for start in range(0, len(img), per_step):
+        at = np.flatnonzero((select[0] >= start) & (select[0] < start + per_step))
+        if len(at) == 0:
+            continue
+        rows = torch.from_numpy(select[0][at] - start)
+        cols = torch.from_numpy(select[1][at] * ncols + select[2][at])
+        patches = F.unfold(img[start:start + per_step, None], size, stride=stride)[rows, :, cols]
+        masks = F.unfold(foreground[start:start + per_step, None].to(img.dtype), size, stride=stride)[rows, :, cols]
+        values[torch.from_numpy(at)] = masked_percentile(patches, masks > 0.5, PATCH_PERCENTILE)
+    return values.numpy()
+
+
+def scan_scale(img, foreground, indicators, size, stride, is_ct, thresholds, center, radial_cutoff):
+    """scale_mask of one patch size for the whole stack."""
+    n, h, w = img.shape
+    ys, xs = window_origins(h, size, stride), window_origins(w, size, stride)
+    grid = torch.zeros((n, len(ys), len(xs)), dtype=torch.float64)
+    if grid.numel() == 0:
+        return max_splat(grid, size, stride, img.shape, img.dtype)
+
+    counts = window_counts(foreground[:, None], size, stride)[:, 0].numpy()
+    candidates = counts >= size * size * MIN_FOREGROUND
+    if not is_ct:
+        # Radial filter: ignore edge artifacts (skull ring)
+        cy, cx = (c[:, None, None] for c in center)
+        pcy, pcx = ys[:, None] + size // 2, xs[None, :] + size // 2
+        candidates &= np.sqrt((pcy - cy) ** 2 + (pcx - cx) ** 2) <= radial_cutoff[:, None, None]
+
+    select = np.nonzero(candidates)
+    if len(select[0]) == 0:
+        return max_splat(grid, size, stride, img.shape, img.dtype)
+
+    # "80th percentile > T" from counts of foreground pixels above T +/- eps
+    fg_count = counts[select]
+    below, above, _ = percentile_ranks(fg_count, PATCH_PERCENTILE)
+    indicator_counts = window_counts(indicators, size, stride).numpy()
+    known, undecided = {}, np.zeros(len(fg_count), dtype=bool)
+    for c, role in enumerate(thresholds):
+        over, near = indicator_counts[:, 2 * c], indicator_counts[:, 2 * c + 1]
+        certainly_above = over[select] >= fg_count - below
+        certainly_below = near[select] <= fg_count - 1 - above
+        known[role] = certainly_above
+        undecided |= ~(certainly_above | certainly_below)
+    scores = score_windows(lambda r: known[r], lambda r: ~known[r], is_ct)
+
+    exact = np.flatnonzero(undecided)
+    if len(exact):
+        at = tuple(axis[exact] for axis in select)
+        values = exact_percentiles(img, foreground, size, stride, at, len(xs))
+        # Per-slice thresholds are looked up for each window's slice
+        per_window = {role: t[at[0]] if np.ndim(t) else t for role, t in thresholds.items()}
+        scores[exact] = score_windows(lambda r: values > per_window[r], lambda r: values < per_window[r], is_ct)
+
+    grid[tuple(torch.from_numpy(axis) for axis in select)] = torch.from_numpy(scores)
+    return max_splat(grid, size, stride, img.shape, img.dtype)
+
+
+def stack_symmetry(img, foreground):
+    """batch.stack_symmetry on a tensor stack (masks come back as NumPy arrays / None)."""
+    n, h, w = img.shape
+    xs = torch.arange(w, dtype=torch.float64)
+    split = ((foreground.sum(dim=1).to(torch.float64) @ xs) / foreground.sum(dim=(1, 2))).long().numpy()
+
+    masks = [None] * n
+    for center_x in np.unique(split):
+        group = np.flatnonzero(split == center_x)
+        min_width = int(min(center_x, w - center_x))
+        halves = img[torch.from_numpy(group)]
+        left_flipped = halves[:, :, center_x - min_width:center_x].flip(-1)
+        right_side = halves[:, :, center_x:center_x + min_width]
+        diff_map = (gaussian_smooth(left_flipped, 3.0) - gaussian_smooth(right_side, 3.0)).abs()
+
+        # Ignore center line artifacts
+        diff_map[..., :10] = 0
+        diff_map[..., -10:] = 0
+        mid_slice = diff_map.shape[-1] // 2
+        diff_map[..., mid_slice - 10:mid_slice + 10] = 0
+
+        global_asymmetry = diff_map.to(torch.float64).mean(dim=(1, 2)).tolist()
+        symmetric = [j for j in range(len(group)) if not is_abdomen(global_asymmetry[j])]
+        if not symmetric:
+            continue
+        asymmetry_clean = gaussian_smooth((diff_map[symmetric] > 0.20).to(torch.float64), 1.5)
+        roi = box_morphology(box_morphology(asymmetry_clean > 0.4, 3, erode=True), 3, erode=False).numpy()
+        for j, asymmetry_roi in zip(symmetric, roi):
+            if is_focal(asymmetry_roi):
+                masks[group[j]] = mirrored_mask(img[group[j]].numpy(), asymmetry_roi, center_x, min_width)
+    return masks
+
+
+def tensor_view(x, name):
+    """tta.view on a tensor (a copy: torch has no negative strides)."""
+    if name == "fliplr":
+        return x.flip(-1)
+    if name == "flipud":
+        return x.flip(-2)
+    if name == "rot90":
+        return torch.rot90(x, 1, dims=(-2, -1))
+    return x
+
+
+def scan_patches(img, foreground, indicators, is_ct, thresholds, center, radial_cutoff):
+    """scanner.scan_patches on a tensor stack (the accumulated mask)."""
+    # Pooled by both scales: converted for window_counts once
+    indicators = indicators.to(torch.float32)
+    accumulated = torch.zeros_like(img)
+    for size, ratio, weight in zip(PATCH_SIZES, STRIDE_RATIOS, SCALE_WEIGHTS):
+        accumulated += scan_scale(img, foreground, indicators, size, int(size * ratio), is_ct,
+                                  thresholds, center, radial_cutoff) * weight
+    return accumulated
+
+
+def analyze_stack(stack, is_ct=False):
+    """batch.analyze_stack with torch ops: analyze_slice results for every slice of an (N, H, W) array."""
+    stack = np.require(stack, requirements=["C", "W"])
+    with robust_threads(), torch.no_grad():
+        img = torch.from_numpy(stack)
+        foreground, center, radial_cutoff, thresh_high_stat, thresh_low_stat = stack_statistics(img)
+        thresholds = decision_thresholds(is_ct, thresh_high_stat, thresh_low_stat)
+        indicators = threshold_indicators(img, foreground, thresholds)
+        accumulated = scan_patches(img, foreground, indicators, is_ct, thresholds, center, radial_cutoff)
+        symmetry = stack_symmetry(img, foreground)
+
+    foreground, accumulated = foreground.numpy(), accumulated.numpy()
+    return [slice_decision(stack[i], is_ct, foreground[i], accumulated[i], symmetry[i])
+            for i in range(len(stack))]
+
+
+def analyze_stack_views(stack, is_ct=False, views=TTA_VIEWS):
+    """
+    tta.analyze_stack_views with torch ops. Foreground, thresholds,
+    threshold indicators and the original/flipud symmetry are computed once
+    and carried to the views by index transforms; the views are then
+    scanned (and their remaining symmetry masks computed) as one batch.
+    """
+    stack = np.require(stack, requirements=["C", "W"])
+    n, h, w = stack.shape
+    shared = [name for name in views if name != "rot90" or h == w]
+    k = len(shared)
+
+    with robust_threads(), torch.no_grad():
+        img = torch.from_numpy(stack)
+        foreground, center, radial_cutoff, thresh_high_stat, thresh_low_stat = stack_statistics(img)
+        thresholds = decision_thresholds(is_ct, thresh_high_stat, thresh_low_stat)
+        indicators = threshold_indicators(img, foreground, thresholds)
+
+        # The shared views one after another along the slice axis, with their per-slice values tiled
+        viewed = torch.cat([tensor_view(img, name) for name in shared])
+        viewed_foreground = torch.cat([tensor_view(foreground, name) for name in shared])
+        centers = [view_center(center, (h, w), name) for name in shared]
+        accumulated = scan_patches(
+            viewed, viewed_foreground, torch.cat([tensor_view(indicators, name) for name in shared]), is_ct,
+            {role: np.tile(t, k) if np.ndim(t) else t for role, t in thresholds.items()},
+            (np.concatenate([c[0] for c in centers]), np.concatenate([c[1] for c in centers])),
+            np.tile(radial_cutoff, k),
+        )
+
+        asymmetry = stack_symmetry(img, foreground)
+        symmetry = {
+            "original": asymmetry,
+            "flipud": [None if mask is None else view(mask, "flipud") for mask in asymmetry],
+        }
+        rest = [j for j, name in enumerate(shared) if name not in symmetry]
+        if rest:
+            at = torch.cat([torch.arange(j * n, (j + 1) * n) for j in rest])
+            masks = stack_symmetry(viewed[at], viewed_foreground[at])
+            for i, j in enumerate(rest):
+                symmetry[shared[j]] = masks[i * n:(i + 1) * n]
+
+    viewed_foreground, accumulated = viewed_foreground.numpy(), accumulated.numpy()
+    results = {}
+    for j, name in enumerate(shared):
+        slices, offset = view(stack, name), j * n
+        results[name] = [slice_decision(slices[i], is_ct, viewed_foreground[offset + i], accumulated[offset + i],
+                                        symmetry[name][i]) for i in range(n)]
+    if len(shared) < len(views):
+        # Non-square slices keep the scipy rotation (see tta.py)
+        rotated = np.stack([ndimage.rotate(img, 90, reshape=False) for img in stack])
+        results["rot90"] = analyze_stack(rotated, is_ct)
+    return [results[name] for name in views]
@@ -0,0 +1,144 @@
+# backend/detection/robust/tta.py
+"""
+Test-time augmentation for the robust analyzer.
+
+process_analysis averages the analyzer over four views of a slice:
+original, left-right flip, up-down flip and a 90 degree rotation. Flips and
+rot90 only permute pixels, so everything that depends on the pixel set
+rather than its layout is computed once and carried over by an index
+transform: the eroded foreground mask (the 3x3 erosion commutes with
+flips/rotations), its quartile thresholds, the centroid and radial cutoff,
+and the patch scan's threshold indicators. The up-down flip also keeps the
+left/right symmetry mask (scipy's symmetric Gaussian and the 3x3 opening
+commute with it). Only the view-dependent parts (patch grid, symmetry
+split of the other views) are rerun.
+
+The rotation is np.rot90, which matches scipy.ndimage.rotate(img, 90,
+reshape=False) on square slices without spline interpolation. Non-square
+slices keep the scipy rotation, which crops and pads instead of
+transposing the shape.
+
+tta_consensus_slices does the same for many slices of a volume at once,
+on (N, H, W) stacks through the batched analyzer (batch.py), or through
+the torch analyzer (torch_backend.py) with AURAMED_ROBUST_BACKEND=torch.
+"""
+import os
+
+import numpy as np
+
+from backend.utils.lazy import lazy_import
+from backend.detection.robust.analyzer import analyze_slice, slice_statistics, symmetry_mask
+from backend.detection.robust.batch import ROBUST_BATCH, analyze_stack, stack_statistics, stack_symmetry
+from backend.detection.robust.scanner import threshold_counts
+
+ndimage = lazy_import("scipy.ndimage")
+
+TTA_VIEWS = ("original", "fliplr", "flipud", "rot90")
+
+# Stack analyzer behind tta_consensus_slices: "numpy" or "torch"
+ROBUST_BACKEND = os.environ.get("AURAMED_ROBUST_BACKEND", "numpy")
+
+
+def view(array, name):
+    """The view's pixels as an index transform of the original (no copy); stacks are viewed slice-wise."""
+    if name == "fliplr":
+        return np.flip(array, axis=-1)
+    if name == "flipud":
+        return np.flip(array, axis=-2)
+    if name == "rot90":
+        return np.rot90(array, axes=(-2, -1))
+    return array
+
+
+def view_center(center, shape, name):
+    """Where the (cy, cx) point (or per-slice points) of the original lands in the view."""
+    cy, cx = center
+    h, w = shape
+    if name == "fliplr":
+        return cy, (w - 1) - cx
+    if name == "flipud":
+        return (h - 1) - cy, cx
+    if name == "rot90":
+        # np.rot90: out[i, j] = in[j, w - 1 - i]
+        return (w - 1) - cx, cy
+    return cy, cx
+
+
+def analyze_views(img_norm, is_ct=False, views=TTA_VIEWS):
+    """analyze_slice results for each TTA view, sharing the view-invariant work."""
+    foreground_mask, center, radial_cutoff, thresh_high_stat, thresh_low_stat = slice_statistics(img_norm)
+    counter = threshold_counts(img_norm, foreground_mask, is_ct, thresh_high_stat, thresh_low_stat)
+    asymmetry = symmetry_mask(img_norm, foreground_mask)
+    shared_symmetry = {
+        "original": (asymmetry,),
+        "flipud": (None if asymmetry is None else view(asymmetry, "flipud"),),
+    }
+
+    results = []
+    for name in views:
+        if name == "rot90" and img_norm.shape[0] != img_norm.shape[1]:
+            results.append(analyze_slice(ndimage.rotate(img_norm, 90, reshape=False), is_ct=is_ct))
+            continue
+        stats = (view(foreground_mask, name), view_center(center, img_norm.shape, name),
+                 radial_cutoff, thresh_high_stat, thresh_low_stat)
+        results.append(analyze_slice(view(img_norm, name), is_ct=is_ct, stats=stats,
+                                     counter=counter.transformed(lambda a: view(a, name)),
+                                     symmetry=shared_symmetry.get(name)))
+    return results
+
+
+def tta_consensus(img_norm, is_ct=False):
+    """
+    (original view's analyze_slice result, mean anomaly ratio, mean max
+    intensity) over the TTA views.
+    """
+    results = analyze_views(img_norm, is_ct)
+    avg_ratio = np.mean([r[4] for r in results])
+    avg_max_int = np.mean([r[3] for r in results])
+    return results[0], avg_ratio, avg_max_int
+
+
+def analyze_stack_views(stack, is_ct=False, views=TTA_VIEWS):
+    """analyze_views for every slice of an (N, H, W) stack: per view, the list of per-slice results."""
+    foreground, center, radial_cutoff, thresh_high_stat, thresh_low_stat = stack_statistics(stack)
+    counter = threshold_counts(stack, foreground, is_ct, thresh_high_stat, thresh_low_stat)
+    asymmetry = stack_symmetry(stack, foreground)
+    shared_symmetry = {
+        "original": asymmetry,
+        "flipud": [None if mask is None else view(mask, "flipud") for mask in asymmetry],
+    }
+
+    results = []
+    shape = stack.shape[1:]
+    for name in views:
+        if name == "rot90" and shape[0] != shape[1]:
+            rotated = np.stack([ndimage.rotate(img, 90, reshape=False) for img in stack])
+            results.append(analyze_stack(rotated, is_ct=is_ct))
+            continue
+        stats = (view(foreground, name), view_center(center, shape, name),
+                 radial_cutoff, thresh_high_stat, thresh_low_stat)
+        results.append(analyze_stack(view(stack, name), is_ct=is_ct, stats=stats,
+                                     counter=counter.transformed(lambda a: view(a, name)),
+                                     symmetry=shared_symmetry.get(name)))
+    return results
+
+
+def tta_consensus_slices(volume, indices, is_ct=False, batch=ROBUST_BATCH, backend=ROBUST_BACKEND):
+    """
+    Yields (index, tta_consensus(volume[index])) for the given slice
+    indices, analyzing them batch slices at a time.
+    """
+    stack_views = analyze_stack_views
+    if backend == "torch":
+        from backend.detection.robust import torch_backend
+        stack_views = torch_backend.analyze_stack_views
+
+    indices = list(indices)
+    for start in range(0, len(indices), batch):
+        chunk = indices[start:start + batch]
+        per_view = stack_views(volume[chunk], is_ct)
+        for i, idx in enumerate(chunk):
+            results = [view_results[i] for view_results in per_view]
+            avg_ratio = np.mean([r[4] for r in results])
+            avg_max_int = np.mean([r[3] for r in results])
+            yield idx, (results[0], avg_ratio, avg_max_int)
@@ -1,21 +1,67 @@
-import torch
-import numpy as np
-from torchvision import transforms
-from PIL import Image
-
-
-def run_ct_inference(img_path, model, device):
-    transform = transforms.Compose([
-        transforms.Grayscale(),
-        transforms.Resize((128, 128)),
-        transforms.ToTensor()
-    ])
-
-    img = Image.open(img_path)
-    x = transform(img).unsqueeze(0).to(device)
-
-    with torch.no_grad():
-        recon = model(x)
-        error = torch.mean((x - recon) ** 2).item()
-
-    return error, None
+import torch
+import torch.nn.functional as F
+import numpy as np
+from torchvision import transforms
+from PIL import Image
+
+from backend.detection.registry import get_registry
+from backend.detection.backends import model_device
+from backend.preprocessing.context import VolumeContext, clip_normalize
+from backend.utils.uploads import open_image
+
+# Autoencoder input edge (trained on 128px grayscale slices)
+CT_INPUT_SIZE = 128
+
+VOLUME_SUFFIXES = (".nii", ".nii.gz", ".zip")
+
+
+transform = transforms.Compose([
+    transforms.Grayscale(),
+    transforms.Resize((128, 128)),
+    transforms.ToTensor()
+])
+
+
+def run_ct_inference(img_path, model, device):
+    img = Image.open(img_path)
+    x = transform(img).unsqueeze(0).to(device)
+
+    with torch.no_grad():
+        recon = model(x)
+        error = torch.mean((x - recon) ** 2).item()
+
+    return error, None
+
+
+def ct_input(upload, size=CT_INPUT_SIZE):
+    """
+    (1, 1, size, size) autoencoder input from an upload: the middle axial
+    slice of a NIfTI / zipped DICOM volume scaled to [0, 1], or a 2D image
+    through the training transform.
+    """
+    if upload.suffix not in VOLUME_SUFFIXES:
+        return transform(open_image(upload)).unsqueeze(0)
+
+    # Only the middle slice is read from the volume
+    reader = VolumeContext(upload).reader
+    axial = clip_normalize(reader.slice(reader.depth // 2)).astype(np.float32)
+    x = torch.from_numpy(axial)[None, None]
+    return F.interpolate(x, size=(size, size), mode="bilinear", align_corners=False)
+
+
+def infer_ct(upload):
+    """
+    Per-pixel reconstruction error map from the resident CT autoencoder
+    for a SpooledUpload (see ct_input). For a 2D image, the mean of the map
+    equals the score returned by run_ct_inference.
+    """
+    model = get_registry().get("ct_autoencoder")
+    device = model_device(model)
+
+    x = ct_input(upload).to(device)
+
+    with torch.no_grad():
+        recon = model(x)
+        error_map = ((x - recon) ** 2)[0, 0]
+
+    return error_map.cpu().numpy()
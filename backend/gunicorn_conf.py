@@ -0,0 +1,29 @@
+"""
+Multi-worker serving with model weights shared between workers.
+
+    gunicorn -c backend/gunicorn_conf.py backend.app:app
+
+The app (and every model in the registry) is loaded once in the master
+process; workers are forked afterwards and share the read-only weight pages
+copy-on-write. Check GET /stats -> memory.uss_mb on each worker to confirm
+that the weights are not counted as unique memory.
+
+uvicorn --workers spawns fresh interpreters instead of forking; in that mode
+the sharing comes from memory-mapped checkpoints (AURAMED_MMAP_WEIGHTS=1).
+"""
+import os
+
+bind = os.environ.get("AURAMED_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master before workers are forked. Only load weights here:
+    # running a forward pass would start torch's OpenMP pool, which is not
+    # fork-safe.
+    from backend.detection.registry import get_registry
+
+    loaded = get_registry().preload()
+    server.log.info(f"Preloaded models before fork: {loaded}")
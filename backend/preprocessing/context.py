@@ -0,0 +1,151 @@
+# backend/preprocessing/context.py
+import logging
+
+import numpy as np
+
+from backend.preprocessing.volume import VolumeReader
+from backend.preprocessing.quantiles import percentiles
+from backend.preprocessing.resample import resample_linear
+from backend.utils.uploads import load_dicom_zip, load_nifti, open_image
+
+logger = logging.getLogger("context")
+
+# Soft tissue window (level 50, width 350) applied to CT volumes
+CT_WINDOW = (-125.0, 225.0)
+
+# Autoencoder input edge (SwinUNETR was trained on 96^3 volumes)
+AE_SIZE = 96
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+def clip_normalize(data, low_pct=0.5, high_pct=99.5):
+    """Clip to the [low_pct, high_pct] percentiles, then min-max scale to [0, 1]."""
+    # Histogram percentiles: O(n) instead of a partial sort of every voxel
+    low, high = percentiles(data, [low_pct, high_pct])
+    # Both lie within the data range, so they are the clipped min and max
+    return (np.clip(data, low, high) - low) / (high - low + 1e-8)
+
+
+class _Context:
+    def __init__(self, upload):
+        self.upload = upload
+        self._views = {}
+
+    def _memo(self, name, build):
+        if name not in self._views:
+            self._views[name] = build()
+        return self._views[name]
+
+
+class VolumeContext(_Context):
+    """
+    Everything process_analysis derives from one uploaded volume.
+
+    The upload is decoded at most once. Each stage asks for the view it
+    needs (cropped, resampled, normalized, autoencoder input) and every view
+    is built on first use from the one before it, then memoized. Views are
+    shared between stages, so callers must not modify them in place.
+    """
+
+    def __init__(self, upload, crop=(0.1, 0.9), target_zoom=1.0):
+        super().__init__(upload)
+        self.crop = crop
+        self.target_zoom = target_zoom
+
+    @property
+    def nifti(self):
+        # Zipped DICOM series are assembled into the same Nifti1Image layout
+        return self._memo("nifti", lambda: load_dicom_zip(self.upload) if self.upload.suffix == ".zip"
+                          else load_nifti(self.upload))
+
+    @property
+    def reader(self):
+        return self._memo("reader", lambda: VolumeReader(self.nifti))
+
+    @property
+    def affine(self):
+        return self.nifti.affine
+
+    def volume(self):
+        """Whole volume, float32 (X, Y, Z)."""
+        return self._memo("volume", lambda: _readonly(self.reader.read()))
+
+    def cropped(self):
+        """
+        Volume without the top/bottom Z slices (air/bed artifacts). Sliced
+        from the whole volume if that is already decoded, otherwise only the
+        kept slab is read.
+        """
+        def build():
+            z0, z1 = self.reader.z_range(*self.crop)
+            if "volume" in self._views:
+                return self._views["volume"][:, :, z0:z1]
+            return _readonly(self.reader.read(z0, z1))
+        return self._memo("cropped", build)
+
+    def resampled(self):
+        """Cropped volume at isotropic target_zoom spacing (fixes the thick-slice "pancake" effect)."""
+        def build():
+            data = self.cropped()
+            zooms = self.reader.zooms
+            # Only resample if spacing is significantly different (>10%)
+            if not any(abs(z - self.target_zoom) > 0.1 for z in zooms):
+                return data
+            logger.info(f"Detected Anisotropic Spacing {zooms}. Resampling to Isotropic {self.target_zoom}mm...")
+            data = _readonly(resample_linear(data, [z / self.target_zoom for z in zooms]))
+            logger.info(f"Resampled Shape: {data.shape}")
+            return data
+        return self._memo("resampled", build)
+
+    def normalized(self):
+        """(resampled volume scaled to [0, 1], is_ct)."""
+        def build():
+            data = self.resampled()
+            # Hounsfield units span air to bone; anything else is a relative-intensity modality
+            is_ct = np.min(data) < -500 and np.max(data) > 1000
+            if is_ct:
+                low, high = CT_WINDOW
+                data = (np.clip(data, low, high) - low) / (high - low)
+            else:
+                data = clip_normalize(data)
+            return _readonly(data), is_ct
+        return self._memo("normalized", build)
+
+    def autoencoder_input(self, size=AE_SIZE):
+        """
+        Whole volume as a (1, 1, size, size, size) tensor scaled to [0, 1],
+        matching the MONAI LoadImage -> Resize(area) -> ScaleIntensity
+        pipeline without reading the file a second time.
+        """
+        def build():
+            import torch
+            import torch.nn.functional as F
+
+            # Own C-ordered copy: the shared volume is read-only and may be Fortran-ordered
+            x = torch.from_numpy(np.array(self.volume(), dtype=np.float32, order="C"))[None, None]
+            x = F.interpolate(x, size=(size, size, size), mode="area")
+            low, high = x.min(), x.max()
+            return (x - low) / (high - low) if high > low else torch.zeros_like(x)
+        return self._memo(f"autoencoder_{size}", build)
+
+
+class ImageContext(_Context):
+    """2D counterpart of VolumeContext: the upload is decoded once and each view memoized."""
+
+    def __init__(self, upload, size=(224, 224)):
+        super().__init__(upload)
+        self.size = size
+
+    def gray(self):
+        return self._memo("gray", lambda: open_image(self.upload).convert("L"))
+
+    def resized(self):
+        return self._memo("resized", lambda: _readonly(np.array(self.gray().resize(self.size))))
+
+    def normalized(self):
+        """Resized image, percentile-clipped and scaled to [0, 1]."""
+        return self._memo("normalized", lambda: _readonly(clip_normalize(self.resized())))
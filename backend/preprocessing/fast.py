@@ -0,0 +1,64 @@
+# backend/preprocessing/fast.py
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# Let PIL shrink by whole factors (box reduce) before the final bilinear
+# pass when the source is at least this many times larger than the target
+REDUCING_GAP = 3.0
+
+_luts = {}
+
+
+def normalize_lut(mean, std):
+    """
+    (C, 256) table mapping a uint8 gray level straight to the normalized
+    float of each output channel: (v / 255 - mean) / std, computed exactly
+    like ToTensor + Normalize do.
+    """
+    key = (tuple(mean), tuple(std))
+    lut = _luts.get(key)
+    if lut is None:
+        levels = torch.arange(256, dtype=torch.float32).div(255)
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(-1, 1)
+        std_t = torch.tensor(std, dtype=torch.float32).view(-1, 1)
+        lut = _luts[key] = levels.unsqueeze(0).sub(mean_t).div(std_t).contiguous()
+    return lut
+
+
+def decode_gray(fp, size=(224, 224)):
+    """
+    Decode to an 8-bit grayscale PIL image of exactly `size`.
+
+    JPEGs are decoded in draft mode: libjpeg scales by 1/2, 1/4 or 1/8
+    during the IDCT and converts to L on the fly, so a 3000x3000 radiograph
+    never materializes at full resolution.
+    """
+    img = Image.open(fp)
+    if img.format == "JPEG":
+        img.draft("L", size)
+    if img.mode != "L":
+        img = img.convert("L")
+    return img.resize(size, Image.BILINEAR, reducing_gap=REDUCING_GAP)
+
+
+def preprocess_fast(fp, size=(224, 224), mean=IMAGENET_MEAN, std=IMAGENET_STD, out=None):
+    """
+    Reduced-scale decode, then grayscale -> C channels + normalization in a
+    single table lookup written into `out` (a preallocated (C, H, W) float
+    tensor, e.g. one slot of a batch). Pass mean=(0,), std=(1,) for plain
+    [0, 1] single-channel input.
+    """
+    lut = normalize_lut(mean, std)
+    channels = lut.shape[0]
+    if out is None:
+        out = torch.empty(channels, size[1], size[0], dtype=torch.float32)
+
+    gray = decode_gray(fp, size)
+    # PIL buffer -> int64 indices (index_select needs a long index)
+    index = torch.from_numpy(np.asarray(gray, dtype=np.int64).reshape(-1))
+    torch.index_select(lut, 1, index, out=out.view(channels, -1))
+    return out
@@ -0,0 +1,123 @@
+# backend/preprocessing/quantiles.py
+import os
+
+import numpy as np
+
+# Histogram resolution for float data, and elements binned per pass step
+# (bounds the index temporaries to a few MB whatever the volume size)
+QUANTILE_BINS = int(os.environ.get("AURAMED_QUANTILE_BINS", "4096"))
+QUANTILE_CHUNK = int(os.environ.get("AURAMED_QUANTILE_CHUNK", str(1 << 20)))
+
+# Integer data spanning at most this many values gets one bin per value (exact)
+MAX_INTEGER_BINS = 1 << 16
+
+
+class Histogram:
+    """
+    Fixed-range histogram that can be fed in chunks (slabs, slices) and
+    answers any number of percentiles from its cumulative counts, so each
+    percentile costs O(bins) instead of a partial sort of the data.
+
+    Percentiles follow np.percentile's default (linear) method. With
+    integer=True every value has its own bin and the result is exact;
+    otherwise each order statistic is placed linearly within its bin, so
+    the error is below one bin width, (hi - lo) / bins.
+    """
+
+    def __init__(self, lo, hi, bins=QUANTILE_BINS, integer=False):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.integer = integer
+        if integer:
+            bins = int(self.hi - self.lo) + 1
+            self.width = 1.0
+        else:
+            self.width = (self.hi - self.lo) / bins if self.hi > self.lo else 1.0
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def update(self, values, chunk=QUANTILE_CHUNK):
+        """Add values (any shape) to the histogram."""
+        flat = np.asarray(values).ravel(order="K")
+        for start in range(0, flat.size, chunk):
+            part = flat[start:start + chunk]
+            if self.integer:
+                idx = part.astype(np.intp) - int(self.lo)
+            else:
+                idx = ((part - self.lo) * (1.0 / self.width)).astype(np.intp)
+                np.clip(idx, 0, self.bins - 1, out=idx)
+            self.counts += np.bincount(idx, minlength=self.bins)
+        return self
+
+    def order_statistics(self, ranks):
+        """Values of the k-th smallest elements (0-based ranks)."""
+        ranks = np.asarray(ranks)
+        cdf = np.cumsum(self.counts)
+        b = np.searchsorted(cdf, ranks, side="right")
+        if self.integer:
+            return self.lo + b
+        before = cdf[b] - self.counts[b]
+        # Elements assumed evenly spread over their bin
+        offset = (ranks - before + 0.5) / self.counts[b]
+        return np.minimum(self.lo + (b + offset) * self.width, self.hi)
+
+    def percentile(self, q):
+        """Same as np.percentile(data, q) over everything fed so far."""
+        n = self.count
+        if n == 0:
+            raise ValueError("percentile of an empty histogram")
+        pos = (n - 1) * np.asarray(q, dtype=np.float64) / 100.0
+        k = np.floor(pos).astype(np.int64)
+        frac = pos - k
+        below = self.order_statistics(k)
+        above = self.order_statistics(np.minimum(k + 1, n - 1))
+        return below + (above - below) * frac
+
+
+def histogram_for(data, bins=QUANTILE_BINS):
+    """Histogram spanning data's range; integer dtypes with a small span get exact unit bins."""
+    data = np.asarray(data)
+    lo, hi = np.min(data), np.max(data)
+    integer = data.dtype.kind in "ui" and int(hi) - int(lo) < MAX_INTEGER_BINS
+    return Histogram(lo, hi, bins, integer=integer).update(data)
+
+
+def percentiles(data, q, bins=QUANTILE_BINS):
+    """
+    O(n) replacement for np.percentile(data, q): one min/max pass and one
+    binning pass, then every requested percentile from the same histogram.
+    """
+    return histogram_for(data, bins).percentile(q)
+
+
+def stack_percentiles(data, valid, q, bins=QUANTILE_BINS):
+    """
+    percentiles(data[i][valid[i]], q) for every slice i of a float stack,
+    binned in one pass over the whole stack (one bincount over
+    slice * bins + bin). Every slice needs at least one valid element.
+    Returns an (n_slices, len(q)) array.
+    """
+    n = len(data)
+    flat, mask = data.reshape(n, -1), valid.reshape(n, -1)
+    lo = np.where(mask, flat, np.inf).min(axis=1)
+    hi = np.where(mask, flat, -np.inf).max(axis=1)
+    hists = [Histogram(l, h, bins) for l, h in zip(lo, hi)]
+
+    # Same arithmetic as Histogram.update: offsets and scale in the data dtype
+    scale = np.array([1.0 / hist.width for hist in hists]).astype(data.dtype)
+    values = flat[mask]
+    rows = np.repeat(np.arange(n), mask.sum(axis=1))
+    counts = np.zeros(n * bins, dtype=np.int64)
+    for start in range(0, values.size, QUANTILE_CHUNK):
+        part, at = values[start:start + QUANTILE_CHUNK], rows[start:start + QUANTILE_CHUNK]
+        idx = ((part - lo[at]) * scale[at]).astype(np.intp)
+        np.clip(idx, 0, bins - 1, out=idx)
+        counts += np.bincount(at * bins + idx, minlength=n * bins)
+
+    for hist, row in zip(hists, counts.reshape(n, bins)):
+        hist.counts = row
+    return np.array([hist.percentile(q) for hist in hists])
@@ -0,0 +1,79 @@
+# backend/preprocessing/resample.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Output Z slices per work item, and threads working on them
+RESAMPLE_CHUNK = int(os.environ.get("AURAMED_RESAMPLE_CHUNK", "16"))
+RESAMPLE_WORKERS = int(os.environ.get("AURAMED_RESAMPLE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def zoom_shape(shape, zoom):
+    """Output shape scipy.ndimage.zoom produces for the same zoom factors."""
+    return tuple(int(round(n * z)) for n, z in zip(shape, zoom))
+
+
+def axis_weights(n_in, n_out):
+    """
+    Source indices and weights for linear interpolation along one axis,
+    using scipy.ndimage.zoom's (grid_mode=False) mapping:
+    in = out_index * (n_in - 1) / (n_out - 1).
+    """
+    if n_in == 1 or n_out == 1:
+        coords = np.zeros(n_out)
+    else:
+        coords = np.arange(n_out) * ((n_in - 1) / (n_out - 1))
+    i0 = np.clip(np.floor(coords).astype(np.intp), 0, max(n_in - 2, 0))
+    i1 = np.minimum(i0 + 1, n_in - 1)
+    w = (coords - i0).astype(np.float32)
+    return i0, i1, w
+
+
+def _interp_axis(arr, axis, i0, i1, w):
+    shape = [1] * arr.ndim
+    shape[axis] = -1
+    w = w.reshape(shape)
+    lo = np.take(arr, i0, axis=axis)
+    hi = np.take(arr, i1, axis=axis)
+    hi -= lo
+    hi *= w
+    lo += hi
+    return lo
+
+
+def resample_linear(volume, zoom, chunk=RESAMPLE_CHUNK, workers=RESAMPLE_WORKERS):
+    """
+    Trilinear resampling of an (X, Y, Z) volume, a float32 replacement for
+    scipy.ndimage.zoom(volume, zoom, order=1, prefilter=False).
+
+    The output is filled chunk by chunk along Z. Each chunk reads only
+    the input Z slab it depends on, interpolates in-plane (X, then Y),
+    then along Z. Peak memory is therefore the output plus a few
+    slab-sized temporaries per worker. Chunks run on a thread pool
+    (NumPy releases the GIL in take/arithmetics).
+    """
+    out_shape = zoom_shape(volume.shape, zoom)
+    ix = axis_weights(volume.shape[0], out_shape[0])
+    iy = axis_weights(volume.shape[1], out_shape[1])
+    i0z, i1z, wz = axis_weights(volume.shape[2], out_shape[2])
+    out = np.empty(out_shape, dtype=np.float32)
+
+    def work(k0):
+        k1 = min(k0 + chunk, out_shape[2])
+        lo = int(i0z[k0:k1].min())
+        hi = int(i1z[k0:k1].max()) + 1
+        slab = np.asarray(volume[:, :, lo:hi], dtype=np.float32)
+        slab = _interp_axis(slab, 0, *ix)
+        slab = _interp_axis(slab, 1, *iy)
+        out[:, :, k0:k1] = _interp_axis(slab, 2, i0z[k0:k1] - lo, i1z[k0:k1] - lo, wz[k0:k1])
+
+    starts = range(0, out_shape[2], chunk)
+    if workers <= 1:
+        for k0 in starts:
+            work(k0)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resample") as pool:
+            # list() re-raises the first worker exception
+            list(pool.map(work, starts))
+    return out
@@ -0,0 +1,43 @@
+# backend/preprocessing/volume.py
+import numpy as np
+
+
+class VolumeReader:
+    """
+    Lazy float32 access to a NIfTI volume through nibabel's dataobj proxy.
+
+    Nothing is read until a slab is requested, and then only that Z range
+    is read and scaled (straight to float32, never float64). Uncompressed
+    files opened with nib.load are memory-mapped, so a slab read touches
+    only the pages that hold it.
+    """
+
+    def __init__(self, img):
+        self.img = img
+        self.shape = tuple(img.shape[:3])
+        self.affine = img.affine
+        self.zooms = tuple(float(z) for z in img.header.get_zooms()[:3])
+
+    @classmethod
+    def open(cls, path):
+        import nibabel as nib
+        return cls(nib.load(path, mmap=True))
+
+    @property
+    def depth(self):
+        return self.shape[2]
+
+    def z_range(self, start_frac=0.0, end_frac=1.0):
+        """Slice bounds covering [start_frac, end_frac) of the Z axis."""
+        return int(self.depth * start_frac), int(self.depth * end_frac)
+
+    def read(self, z0=0, z1=None):
+        """Voxels [:, :, z0:z1] as a float32 (X, Y, Z) array."""
+        z1 = self.depth if z1 is None else z1
+        # 4D files: first frame only
+        extra = (0,) * (len(self.img.shape) - 3)
+        return self.img.slicer[(slice(None), slice(None), slice(z0, z1)) + extra].get_fdata(dtype=np.float32)
+
+    def slice(self, z):
+        """One axial (X, Y) slice."""
+        return self.read(z, z + 1)[:, :, 0]
@@ -0,0 +1,134 @@
+import os
+import io
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger("dicom_series")
+
+# Threads decoding slice pixel data (compressed transfer syntaxes release the GIL)
+DICOM_WORKERS = int(os.environ.get("AURAMED_DICOM_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# DICOM patient space is LPS, NIfTI is RAS
+LPS_TO_RAS = np.diag([-1.0, -1.0, 1.0, 1.0])
+
+
+def _open(source):
+    """dcmread accepts paths and file objects; raw bytes need wrapping."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        # Read twice (headers, then pixels)
+        source.seek(0)
+    return source
+
+
+class SliceHeader:
+    __slots__ = ("source", "series", "position", "orientation", "spacing", "shape", "slope", "intercept")
+
+    def __init__(self, source, ds):
+        self.source = source
+        self.series = getattr(ds, "SeriesInstanceUID", "")
+        self.position = np.array([float(v) for v in ds.ImagePositionPatient])
+        self.orientation = np.array([float(v) for v in ds.ImageOrientationPatient])
+        self.spacing = [float(v) for v in ds.PixelSpacing]  # (row spacing, column spacing)
+        self.shape = (int(ds.Rows), int(ds.Columns))
+        self.slope = float(getattr(ds, "RescaleSlope", 1) or 1)
+        self.intercept = float(getattr(ds, "RescaleIntercept", 0) or 0)
+
+
+def read_headers(sources, workers=DICOM_WORKERS):
+    """Parse every slice up to (not including) the pixel data; non-image files are skipped."""
+    import pydicom
+
+    def read(source):
+        try:
+            ds = pydicom.dcmread(_open(source), stop_before_pixels=True, force=True)
+            return SliceHeader(source, ds)
+        except Exception as e:
+            logger.debug(f"Skipping non-image DICOM member: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dicom") as pool:
+        return [h for h in pool.map(read, sources) if h is not None]
+
+
+def series_affine(headers):
+    """Voxel (column, row, slice) -> RAS mm affine for headers sorted along the slice normal."""
+    first = headers[0]
+    row_cos, col_cos = first.orientation[:3], first.orientation[3:]
+    row_spacing, col_spacing = first.spacing
+
+    if len(headers) > 1:
+        step = (headers[-1].position - first.position) / (len(headers) - 1)
+    else:
+        step = np.cross(row_cos, col_cos)
+
+    affine = np.eye(4)
+    affine[:3, 0] = row_cos * col_spacing   # i runs along a row (columns)
+    affine[:3, 1] = col_cos * row_spacing   # j runs down a column (rows)
+    affine[:3, 2] = step
+    affine[:3, 3] = first.position
+    return LPS_TO_RAS @ affine
+
+
+def load_series(sources, workers=DICOM_WORKERS):
+    """
+    Assemble single-slice DICOM files (paths, file objects or bytes) into
+    a float32 (X, Y, Z) volume with rescale slope/intercept applied, and
+    its RAS affine - the same layout nibabel gives for a NIfTI file.
+
+    Headers are read first (no pixel data) and sorted by
+    ImagePositionPatient along the slice normal. Pixel data is then
+    decoded in parallel straight into the preallocated volume. When
+    several series are present the largest one is used.
+    """
+    import pydicom
+
+    headers = read_headers(sources, workers)
+    if not headers:
+        raise ValueError("No DICOM image slices found")
+
+    by_series = {}
+    for h in headers:
+        by_series.setdefault(h.series, []).append(h)
+    headers = max(by_series.values(), key=len)
+    if len(by_series) > 1:
+        logger.warning(f"{len(by_series)} series found; using the largest ({len(headers)} slices)")
+
+    normal = np.cross(headers[0].orientation[:3], headers[0].orientation[3:])
+    headers.sort(key=lambda h: float(np.dot(h.position, normal)))
+
+    rows, cols = headers[0].shape
+    if any(h.shape != (rows, cols) for h in headers):
+        raise ValueError("DICOM slices have different dimensions")
+    volume = np.empty((cols, rows, len(headers)), dtype=np.float32)
+
+    def decode(k):
+        h = headers[k]
+        ds = pydicom.dcmread(_open(h.source), force=True)
+        pixels = ds.pixel_array.astype(np.float32)
+        if h.slope != 1 or h.intercept != 0:
+            pixels *= h.slope
+            pixels += h.intercept
+        volume[:, :, k] = pixels.T
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dicom") as pool:
+        list(pool.map(decode, range(len(headers))))
+
+    return volume, series_affine(headers)
+
+
+def load_series_image(sources, workers=DICOM_WORKERS):
+    """DICOM series as an in-memory Nifti1Image (drop-in for nib.load results)."""
+    import nibabel as nib
+    volume, affine = load_series(sources, workers)
+    return nib.Nifti1Image(volume, affine)
+
+
+def zip_members(fileobj):
+    """Bytes of every file in a .zip upload (DICOM series are usually sent zipped)."""
+    with zipfile.ZipFile(fileobj) as archive:
+        return [archive.read(info) for info in archive.infolist() if not info.is_dir()]
@@ -0,0 +1,146 @@
+import os
+import asyncio
+import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi.responses import JSONResponse
+
+# Blocking work (torch inference, image decoding, Ollama calls) runs here
+# instead of on the event loop.
+EXECUTOR_WORKERS = int(os.environ.get("AURAMED_EXECUTOR_WORKERS", "8"))
+EXECUTOR_QUEUE_SIZE = int(os.environ.get("AURAMED_EXECUTOR_QUEUE", "32"))
+RETRY_AFTER_SECONDS = int(os.environ.get("AURAMED_RETRY_AFTER", "2"))
+
+
+class ExecutorBusy(Exception):
+    def __init__(self, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__("Server is busy, retry later")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Thread pool with bounded admission. At most max_workers jobs run and at
+    most max_queue wait; anything beyond that is rejected with ExecutorBusy
+    instead of piling up.
+    """
+
+    def __init__(self, max_workers=EXECUTOR_WORKERS, max_queue=EXECUTOR_QUEUE_SIZE,
+                 retry_after=RETRY_AFTER_SECONDS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def acquire(self, count=1):
+        with self._lock:
+            if self._admitted + count > self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusy(self.retry_after)
+            self._admitted += count
+
+    def release(self):
+        with self._lock:
+            self._admitted -= 1
+            self.completed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool, or raise ExecutorBusy if the wait queue is full."""
+        self.acquire()
+        try:
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.release()
+            raise
+        # Released when the job finishes, even if the client goes away first
+        future.add_done_callback(lambda _: self.release())
+        return await asyncio.wrap_future(future)
+
+    def run_many(self, fn, jobs, slots):
+        """
+        Run fn(*args) for every args in jobs on at most `slots` admission
+        slots, all taken up front (ExecutorBusy if the queue cannot hold
+        them). Returns one concurrent Future per job, in order. Each slot
+        runs jobs one after another and is released when it runs out of
+        jobs, so work the caller stopped waiting for still counts until it
+        finishes; cancelling a job's future skips it if it has not started.
+        """
+        jobs = list(jobs)
+        futures = [Future() for _ in jobs]
+        if not jobs:
+            return futures
+        slots = max(1, min(slots, len(jobs)))
+        self.acquire(slots)
+
+        order = iter(range(len(jobs)))
+        order_lock = threading.Lock()
+
+        def next_job():
+            with order_lock:
+                for i in order:
+                    if futures[i].set_running_or_notify_cancel():
+                        return i
+            return None
+
+        def start():
+            i = next_job()
+            if i is None:
+                self.release()
+                return
+            try:
+                job = self._pool.submit(functools.partial(fn, *jobs[i]))
+            except Exception as e:
+                # Pool shut down: fail what is left on this slot
+                while i is not None:
+                    futures[i].set_exception(e)
+                    i = next_job()
+                self.release()
+                return
+            job.add_done_callback(lambda job, i=i: finish(i, job))
+
+        def finish(i, job):
+            if job.exception() is None:
+                futures[i].set_result(job.result())
+            else:
+                futures[i].set_exception(job.exception())
+            start()
+
+        for _ in range(slots):
+            start()
+        return futures
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "queued": max(0, self._admitted - self.max_workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+async def busy_handler(request, exc):
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor()
+        return _executor
@@ -0,0 +1,201 @@
+import io
+import os
+import zlib
+import bisect
+
+# Uncompressed bytes between two checkpoints. Each checkpoint holds a copy
+# of the inflate state (~40 KB, mostly the 32 KB window), so a 500 MB
+# volume costs ~5 MB of index at the default span.
+GZ_INDEX_SPAN_MB = float(os.environ.get("AURAMED_GZ_INDEX_SPAN_MB", "4"))
+
+# Compressed bytes fed to zlib per step; checkpoints land on these boundaries
+FEED_SIZE = 64 * 1024
+
+# Decoded bytes kept behind the read position for short backward seeks
+KEEP_BEHIND = 1 << 20
+
+
+class GzipStream:
+    """zlib inflater for a gzip stream that follows multi-member files across member boundaries."""
+
+    def __init__(self, inflater=None):
+        self.inflater = inflater or zlib.decompressobj(wbits=31)
+
+    def copy(self):
+        return GzipStream(self.inflater.copy())
+
+    def feed(self, chunk):
+        out = [self.inflater.decompress(chunk)]
+        while self.inflater.eof and self.inflater.unused_data:
+            rest = self.inflater.unused_data
+            self.inflater = zlib.decompressobj(wbits=31)
+            out.append(self.inflater.decompress(rest))
+        return out[0] if len(out) == 1 else b"".join(out)
+
+
+class Checkpoint:
+    __slots__ = ("out_offset", "in_offset", "stream")
+
+    def __init__(self, out_offset, in_offset, stream):
+        self.out_offset = out_offset  # uncompressed position
+        self.in_offset = in_offset    # compressed position of the next byte to feed
+        self.stream = stream          # inflate state at that point
+
+
+class GzipIndex:
+    """
+    zran-style random-access index for a gzip stream.
+
+    Built in one forward pass: feed() the compressed chunks as they arrive,
+    e.g. while an upload is being read. Roughly every `span` uncompressed
+    bytes it snapshots the inflate state with decompressobj.copy(). A read
+    at any offset then resumes from the nearest checkpoint instead of
+    decompressing from the start of the file.
+
+    zlib states cannot be serialized, so the index lives in memory next to
+    the upload buffer rather than in a file beside it.
+    """
+
+    def __init__(self, span_mb=GZ_INDEX_SPAN_MB):
+        self.span = max(FEED_SIZE, int(span_mb * 1024 * 1024))
+        self.checkpoints = [Checkpoint(0, 0, GzipStream())]
+        self.size = 0          # uncompressed bytes seen so far
+        self.compressed = 0    # compressed bytes seen so far
+        self._stream = self.checkpoints[0].stream.copy()
+        self._pending = b""
+
+    @classmethod
+    def build(cls, fileobj, span_mb=GZ_INDEX_SPAN_MB):
+        index = cls(span_mb)
+        while True:
+            chunk = fileobj.read(FEED_SIZE)
+            if not chunk:
+                break
+            index.feed(chunk)
+        return index.finish()
+
+    def feed(self, data):
+        """Index the next piece of the compressed stream."""
+        if self._pending:
+            data = self._pending + data
+        view = memoryview(data)
+        offset = 0
+        while len(view) - offset >= FEED_SIZE:
+            self._step(view[offset:offset + FEED_SIZE])
+            offset += FEED_SIZE
+        self._pending = bytes(view[offset:])
+
+    def finish(self):
+        if self._pending:
+            self._step(self._pending)
+            self._pending = b""
+        self._stream = None
+        return self
+
+    def _step(self, chunk):
+        self.size += len(self._stream.feed(chunk))
+        self.compressed += len(chunk)
+        if self.size - self.checkpoints[-1].out_offset >= self.span:
+            self.checkpoints.append(Checkpoint(self.size, self.compressed, self._stream.copy()))
+
+    def checkpoint_for(self, offset):
+        """Last checkpoint at or before the uncompressed offset."""
+        i = bisect.bisect_right([c.out_offset for c in self.checkpoints], offset) - 1
+        return self.checkpoints[max(i, 0)]
+
+
+class IndexedGzipFile(io.RawIOBase):
+    """
+    Seekable, read-only file object over a gzip stream and its GzipIndex.
+    `source` is the compressed bytes or the path of the compressed file.
+    Sequential reads continue from the current inflate state; a seek
+    outside the decoded window restarts from the nearest checkpoint.
+    """
+
+    def __init__(self, source, index):
+        self.index = index
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._raw = io.BytesIO(source)
+            self._owns_raw = False
+        else:
+            self._raw = open(source, "rb")
+            self._owns_raw = True
+        self._pos = 0
+
+        # Decode state: bytes [buf_start, out_pos) of the output are in _buf
+        self._stream = None
+        self._in_pos = 0
+        self._out_pos = 0
+        self._buf = bytearray()
+        self._buf_start = 0
+        self.restarts = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.index.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size=-1):
+        end = self.index.size if size is None or size < 0 else min(self._pos + size, self.index.size)
+        if end <= self._pos:
+            return b""
+
+        if self._stream is None or not (self._buf_start <= self._pos <= self._out_pos):
+            self._restart(self._pos)
+
+        self._raw.seek(self._in_pos)
+        while self._out_pos < end:
+            chunk = self._raw.read(FEED_SIZE)
+            if not chunk:
+                break
+            self._in_pos += len(chunk)
+            out = self._stream.feed(chunk)
+            self._out_pos += len(out)
+            if self._out_pos <= self._pos:
+                # Still before the target: nothing to keep
+                self._buf_start = self._out_pos
+                self._buf.clear()
+            else:
+                self._buf += out
+
+        start = self._pos - self._buf_start
+        data = bytes(self._buf[start:start + (end - self._pos)])
+        self._pos += len(data)
+
+        # Keep only a short window behind the new position
+        if self._pos - self._buf_start > KEEP_BEHIND:
+            drop = self._pos - self._buf_start - KEEP_BEHIND
+            del self._buf[:drop]
+            self._buf_start += drop
+        return data
+
+    def _restart(self, offset):
+        cp = self.index.checkpoint_for(offset)
+        self._stream = cp.stream.copy()
+        self._in_pos = cp.in_offset
+        self._out_pos = cp.out_offset
+        self._buf = bytearray()
+        self._buf_start = cp.out_offset
+        self.restarts += 1
+
+    def close(self):
+        if self._owns_raw and not self._raw.closed:
+            self._raw.close()
+        super().close()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+
+def process_memory():
+    """
+    Memory footprint of the current worker process in MB.
+
+    uss (unique set size) is what this worker alone costs: private pages,
+    excluding pages shared with other workers such as memory-mapped or
+    pre-fork model weights. pss splits shared pages evenly between the
+    processes mapping them.
+    """
+    stats = {"pid": os.getpid()}
+
+    try:
+        fields = {}
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+
+        stats.update({
+            "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+            "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+            "uss_mb": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+            "shared_mb": round((fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024, 1),
+        })
+    except OSError:
+        # No smaps (non-Linux): peak RSS is the best we can report
+        try:
+            import resource
+        except ImportError:  # Windows
+            return stats
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, kB elsewhere
+        stats["max_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    return stats
@@ -0,0 +1,55 @@
+import time
+import logging
+import threading
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("readiness")
+
+
+class Readiness:
+    """
+    Tracks background warm-up so "process up" (health check) and
+    "models warm" (GET /ready) can be reported separately.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.checks = {}
+        self.started_at = None
+        self.warm_seconds = None
+        self._lock = threading.Lock()
+
+    def start(self, steps):
+        """Run (name, fn) warm-up steps in a background thread."""
+        self.started_at = time.time()
+        thread = threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, steps):
+        for name, fn in steps:
+            start = time.perf_counter()
+            try:
+                fn()
+                status = {"status": "ok"}
+            except FileNotFoundError as e:
+                # Missing weights: the app still serves, just without this model
+                status = {"status": "unavailable", "detail": str(e)}
+            except Exception as e:
+                logger.error(f"Warm-up step '{name}' failed: {e}")
+                status = {"status": "failed", "detail": str(e)}
+
+            status["seconds"] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                self.checks[name] = status
+
+        with self._lock:
+            self.ready = True
+            self.warm_seconds = round(time.time() - self.started_at, 3)
+        logger.info(f"Warm-up finished in {self.warm_seconds}s: {self.checks}")
+
+    def response(self):
+        with self._lock:
+            body = {"ready": self.ready, "warmSeconds": self.warm_seconds, "checks": dict(self.checks)}
+        return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
@@ -0,0 +1,134 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("result_cache")
+
+# Analysis results keyed by (upload sha256, modality, model fingerprint, pipeline params)
+RESULT_CACHE_ENABLED = os.environ.get("AURAMED_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_SIZE = int(os.environ.get("AURAMED_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.environ.get("AURAMED_RESULT_CACHE_TTL", "3600"))
+
+
+def weights_fingerprint(paths):
+    """
+    Version of the model files: (path, size, mtime) of every file in the
+    given files/directories. Replacing or re-exporting a checkpoint changes
+    it, which makes every older cache entry unreachable.
+    """
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = [e.path for e in os.scandir(path) if e.is_file()]
+        else:
+            files = [path]
+        for f in files:
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            entries.append((os.path.abspath(f), st.st_size, st.st_mtime_ns))
+    return hashlib.sha256(json.dumps(sorted(entries)).encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    In-process LRU of finished analysis results, bounded by entry count and
+    age. Entries written under an older weights fingerprint are dropped as
+    soon as a change is noticed.
+    """
+
+    def __init__(self, watch=(), max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL,
+                 enabled=RESULT_CACHE_ENABLED):
+        self.watch = list(watch)
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (stored_at, fingerprint, result)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def fingerprint(self):
+        current = weights_fingerprint(self.watch)
+        with self._lock:
+            if self._fingerprint is not None and current != self._fingerprint:
+                logger.info("Model files changed; invalidating cached results")
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            self._fingerprint = current
+        return current
+
+    def key(self, digest, modality, **params):
+        """Cache key for one upload under the current models and pipeline settings."""
+        raw = json.dumps([digest, modality, self.fingerprint(), params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers may decorate the result; never hand out the stored object
+            return copy.deepcopy(entry[2])
+
+    def put(self, key, result):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), self._fingerprint, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from backend.detection.registry import MODELS_DIR, get_registry
+            _cache = ResultCache(watch=[MODELS_DIR] + get_registry().weights_paths())
+        return _cache
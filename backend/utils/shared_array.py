@@ -0,0 +1,40 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedArray:
+    """
+    NumPy array backed by a multiprocessing.shared_memory block. Other
+    processes attach to it from its spec (name, shape, dtype), so arrays
+    are handed to workers without pickling their data.
+
+    The creating process owns the block and frees it on close(); views of
+    .array must be dropped before closing.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        dtype = np.dtype(dtype)
+        shape = tuple(int(n) for n in shape)
+        self.owner = name is None
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.spec = (self.shm.name, shape, dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
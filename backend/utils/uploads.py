@@ -0,0 +1,161 @@
+import io
+import os
+import gzip
+import hashlib
+import zlib
+import logging
+import tempfile
+
+from backend.utils.gzindex import GzipIndex, IndexedGzipFile
+
+logger = logging.getLogger("uploads")
+
+CHUNK_SIZE = 1 << 20  # 1 MB
+
+# Uploads up to this size stay in memory; larger ones spill to one temp file
+UPLOAD_SPILL_MB = float(os.environ.get("AURAMED_UPLOAD_SPILL_MB", "64"))
+
+# Build a random-access index for .nii.gz uploads while they stream in
+GZ_INDEX_ENABLED = os.environ.get("AURAMED_GZ_INDEX", "1") == "1"
+
+
+def upload_suffix(filename):
+    name = (filename or "").lower()
+    if name.endswith(".nii.gz"):
+        return ".nii.gz"
+    return os.path.splitext(name)[1]
+
+
+class SpooledUpload:
+    """
+    An upload read once from the request body, hashed on the way in and
+    held in memory, or in a single temp file once it grows past
+    spill_mb. Decoders read from stream() (or decompressed_stream()), never
+    from a path of their own.
+
+    .nii.gz uploads also get a GzipIndex built during the same pass, so
+    later slab reads seek instead of decompressing from the start.
+
+    Use as a context manager (or call close()) so the spill file is
+    removed deterministically.
+    """
+
+    def __init__(self, src, filename, spill_mb=UPLOAD_SPILL_MB):
+        self.filename = filename
+        self.suffix = upload_suffix(filename)
+        self.spill_bytes = int(spill_mb * 1024 * 1024)
+        self.spill_path = None
+        self.gz_index = GzipIndex() if GZ_INDEX_ENABLED and self.suffix == ".nii.gz" else None
+        self._data = None
+        self._handles = []
+
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+        spill = None
+        size = 0
+        try:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                if self.gz_index is not None:
+                    self._index_chunk(chunk)
+                if spill is None and size > self.spill_bytes:
+                    spill = tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix)
+                    self.spill_path = spill.name
+                    spill.write(buffer.getbuffer())
+                    buffer = None
+                (spill or buffer).write(chunk)
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            if spill is not None:
+                spill.close()
+
+        self.digest = digest.hexdigest()
+        self.size = size
+        if buffer is not None:
+            self._data = buffer.getvalue()
+        if self.gz_index is not None:
+            self._index_chunk(None)
+
+    def _index_chunk(self, chunk):
+        try:
+            if chunk is None:
+                self.gz_index.finish()
+            else:
+                self.gz_index.feed(chunk)
+        except zlib.error as e:
+            # Not valid gzip: decoders will report it; just skip the index
+            logger.warning(f"No gzip index for {self.filename}: {e}")
+            self.gz_index = None
+
+    @property
+    def in_memory(self):
+        return self.spill_path is None
+
+    def stream(self):
+        """A fresh binary file object positioned at the start of the (raw) upload."""
+        if self.in_memory:
+            return io.BytesIO(self._data)
+        handle = open(self.spill_path, "rb")
+        self._handles.append(handle)
+        return handle
+
+    def decompressed_stream(self):
+        """Seekable file object over the decompressed .nii.gz payload, backed by the gzip index."""
+        source = self._data if self.in_memory else self.spill_path
+        handle = IndexedGzipFile(source, self.gz_index)
+        self._handles.append(handle)
+        return handle
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+        self._data = None
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------------------------------------------
+# Decoders reading straight from the upload buffer
+# ------------------------------------------------------------------
+
+def open_image(upload):
+    from PIL import Image
+    return Image.open(upload.stream())
+
+
+def load_nifti(upload):
+    """
+    NIfTI image via nibabel FileHolder. .nii.gz uploads read through the
+    gzip index (random access); uncompressed spill files are memory-mapped.
+    """
+    import nibabel as nib
+
+    if upload.suffix == ".nii.gz" and upload.gz_index is not None:
+        fileobj = upload.decompressed_stream()
+    elif not upload.in_memory:
+        return nib.load(upload.spill_path)
+    else:
+        fileobj = upload.stream()
+        if upload.suffix == ".nii.gz":
+            fileobj = gzip.GzipFile(fileobj=fileobj)
+    holder = nib.FileHolder(fileobj=fileobj)
+    return nib.Nifti1Image.from_file_map({"header": holder, "image": holder})
+
+
+def load_dicom_zip(upload):
+    """Zipped DICOM series as a Nifti1Image (same volume + affine layout as load_nifti)."""
+    from backend.utils.dicom_series import load_series_image, zip_members
+    return load_series_image(zip_members(upload.stream()))
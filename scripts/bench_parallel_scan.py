@@ -0,0 +1,61 @@
+"""
+Equivalence and speed of the process-parallel slice scan
+(backend/detection/robust/parallel.py) against the in-process scan, on
+the slices process_analysis scans in a CT / head volume phantom.
+
+    python scripts/bench_parallel_scan.py
+    python scripts/bench_parallel_scan.py --slices 300 --size 512 --workers 2 4 8 --chunk 2 4
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.detection.robust.parallel import scan_slices, shutdown_scan_pools, warm_scan_pool
+from backend.detection.robust.phantoms import volume_phantom
+
+
+def same_consensus(a, b):
+    (ra, ratio_a, int_a), (rb, ratio_b, int_b) = a, b
+    return (ratio_a == ratio_b and int_a == int_b and np.array_equal(ra[2], rb[2])
+            and all(x == y for i, (x, y) in enumerate(zip(ra, rb)) if i != 2))
+
+
+def main(args):
+    failed = False
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'mode':<5} {'workers':>7} {'chunk':>5} {'serial s':>9} {'pool s':>8} {'speedup':>8}  results")
+    for workers in args.workers:
+        warm_scan_pool(workers)
+    for is_ct in (True, False):
+        volume = volume_phantom(args.slices, args.size, is_ct=is_ct, seed=args.seed)
+        indices = range(int(args.slices * 0.2), int(args.slices * 0.8), 3)
+
+        start = time.perf_counter()
+        ref = dict(scan_slices(volume, indices, is_ct, workers=0))
+        serial_s = time.perf_counter() - start
+        for workers in args.workers:
+            for chunk in args.chunk:
+                start = time.perf_counter()
+                out = dict(scan_slices(volume, indices, is_ct, workers=workers, chunk=chunk))
+                pool_s = time.perf_counter() - start
+                ok = out.keys() == ref.keys() and all(same_consensus(ref[i], out[i]) for i in ref)
+                failed |= not ok
+                print(f"{'ct' if is_ct else 'stat':<5} {workers:>7} {chunk:>5} {serial_s:>9.2f} {pool_s:>8.2f} "
+                      f"{serial_s / pool_s:>7.1f}x  {'identical' if ok else 'MISMATCH'} ({len(ref)} slices)")
+    shutdown_scan_pools()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slices", type=int, default=300)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--chunk", type=int, nargs="+", default=[4])
+    parser.add_argument("--seed", type=int, default=0)
+    raise SystemExit(main(parser.parse_args()))
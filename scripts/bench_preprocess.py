@@ -0,0 +1,82 @@
+"""
+Benchmark the DenseNet preprocessing fast path (backend/preprocessing/fast.py)
+against the torchvision T.Compose chain used by predict_image.
+
+    python scripts/bench_preprocess.py                       # synthetic 3000x3000 JPEG + PNG
+    python scripts/bench_preprocess.py --images a.jpg b.png --runs 20
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+import torchvision.transforms as T
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.preprocessing.fast import preprocess_fast
+
+# Same chain as backend/detection/densenet/infer.py
+reference_transform = T.Compose([
+    T.Resize((224, 224)),
+    T.Grayscale(num_output_channels=3),
+    T.ToTensor(),
+    T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+])
+
+
+def reference(fp):
+    return reference_transform(Image.open(fp).convert("L"))
+
+
+def synthetic(size, fmt):
+    """Smooth radiograph-like gradient with noise, encoded in memory."""
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    img = 128 + 80 * np.sin(6 * xx) * np.cos(4 * yy) + np.random.default_rng(0).normal(0, 3, (size, size))
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(buf, fmt, quality=90)
+    return f"synthetic {size}x{size} {fmt}", buf.getvalue()
+
+
+def time_ms(fn, data, runs):
+    fn(io.BytesIO(data))  # warm-up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(io.BytesIO(data))
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main(args):
+    if args.images:
+        inputs = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                inputs.append((path, f.read()))
+    else:
+        inputs = [synthetic(args.size, "JPEG"), synthetic(args.size, "PNG")]
+
+    # One preallocated slot reused across calls, as a batch buffer would be
+    out = torch.empty(3, 224, 224)
+    fast = lambda fp: preprocess_fast(fp, out=out)
+
+    print(f"{'input':<32} {'compose ms':>11} {'fast ms':>9} {'speedup':>8} {'max|diff|':>10} {'mean|diff|':>11}")
+    for name, data in inputs:
+        ref_ms = time_ms(reference, data, args.runs)
+        fast_ms = time_ms(fast, data, args.runs)
+        diff = (preprocess_fast(io.BytesIO(data)) - reference(io.BytesIO(data))).abs()
+        print(f"{name:<32} {ref_ms:>11.2f} {fast_ms:>9.2f} {ref_ms / fast_ms:>7.2f}x "
+              f"{diff.max().item():>10.4f} {diff.mean().item():>11.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", nargs="*")
+    parser.add_argument("--size", type=int, default=3000)
+    parser.add_argument("--runs", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+"""
+Parity and speed of the histogram percentiles
+(backend/preprocessing/quantiles.py) against np.percentile for the
+normalization inputs of process_analysis: an MRI-like float32 volume, a
+CT-like int16 volume, a uint8 2D image and a slice's foreground pixels.
+
+    python scripts/bench_quantiles.py
+    python scripts/bench_quantiles.py --shape 512 512 300 --bins 8192
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.preprocessing.quantiles import histogram_for
+
+
+def timed(fn, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    cases = [
+        ("volume float32", rng.gamma(2.0, 150.0, args.shape).astype(np.float32), [0.5, 99.5]),
+        ("volume int16", rng.normal(40, 300, args.shape).astype(np.int16), [0.5, 99.5]),
+        ("image uint8", rng.integers(0, 256, (224, 224)).astype(np.uint8), [0.5, 99.5]),
+        ("foreground float64", rng.beta(2, 5, 30000), [25, 50, 75]),
+    ]
+
+    failed = False
+    print(f"{'data':<20} {'n':>10} {'numpy ms':>9} {'hist ms':>8} {'speedup':>8} {'max|diff|':>10} {'bin width':>10}")
+    for name, data, q in cases:
+        ref, ref_ms = timed(lambda: np.percentile(data, q), args.runs)
+        hist, hist_ms = timed(lambda: histogram_for(data, args.bins), args.runs)
+        out = hist.percentile(q)
+        diff = np.abs(out - ref).max()
+        ok = diff <= hist.width
+        failed |= not ok
+        print(f"{name:<20} {data.size:>10} {ref_ms:>9.2f} {hist_ms:>8.2f} {ref_ms / hist_ms:>7.1f}x "
+              f"{diff:>10.2e} {hist.width:>10.2e}{'' if ok else '  PARITY FAILED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", type=int, nargs=3, default=[256, 256, 160])
+    parser.add_argument("--bins", type=int, default=4096)
+    parser.add_argument("--runs", type=int, default=3)
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""
+Parity and speed of the chunked float32 resampler
+(backend/preprocessing/resample.py) against the scipy.ndimage.zoom call it
+replaces in process_analysis.
+
+    python scripts/bench_resample.py
+    python scripts/bench_resample.py --shape 512 512 120 --spacing 0.8 0.8 5.0
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.preprocessing.resample import resample_linear
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    # CT-like intensities (HU) with some structure
+    volume = rng.normal(40, 200, args.shape).astype(np.float32)
+    zoom = [s / args.target for s in args.spacing]
+    print(f"input {tuple(args.shape)} float32, zoom {[round(z, 3) for z in zoom]}")
+
+    ref, ref_s, ref_mb = measure(lambda: ndimage.zoom(volume.astype(np.float64), zoom, order=1, prefilter=False))
+    out, fast_s, fast_mb = measure(lambda: resample_linear(volume, zoom, workers=args.workers))
+
+    diff = np.abs(out - ref)
+    scale = np.abs(ref).max()
+    print(f"output {out.shape} (scipy {ref.shape})")
+    print(f"{'':<20} {'seconds':>8} {'peak MB':>8}")
+    print(f"{'scipy zoom float64':<20} {ref_s:>8.2f} {ref_mb:>8.1f}")
+    print(f"{'resample_linear':<20} {fast_s:>8.2f} {fast_mb:>8.1f}   ({ref_s / fast_s:.1f}x)")
+    print(f"max |diff| {diff.max():.3e} (relative {diff.max() / scale:.2e}), mean |diff| {diff.mean():.3e}")
+    ok = out.shape == ref.shape and diff.max() <= args.rtol * scale
+    print("PARITY OK" if ok else "PARITY FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", type=int, nargs=3, default=[384, 384, 80])
+    parser.add_argument("--spacing", type=float, nargs=3, default=[0.8, 0.8, 3.0])
+    parser.add_argument("--target", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rtol", type=float, default=1e-5)
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Equivalence and speed of the shared-work TTA engine
+(backend/detection/robust/tta.py) against the four independent
+_analyze_slice_robust calls process_analysis used to make per slice
+(original, fliplr, flipud, scipy rotate 90).
+
+    python scripts/bench_tta.py
+    python scripts/bench_tta.py --sizes 224 512 --slices 40
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.detection.robust.analyzer import analyze_slice
+from backend.detection.robust.phantoms import slice_phantom
+from backend.detection.robust.tta import tta_consensus
+
+
+def tta_reference(img, is_ct):
+    results = [
+        analyze_slice(img, is_ct=is_ct),
+        analyze_slice(np.fliplr(img), is_ct=is_ct),
+        analyze_slice(np.flipud(img), is_ct=is_ct),
+        analyze_slice(ndimage.rotate(img, 90, reshape=False), is_ct=is_ct),
+    ]
+    return results[0], np.mean([r[4] for r in results]), np.mean([r[3] for r in results])
+
+
+def main(args):
+    failed = False
+    print(f"{'size':>6} {'mode':<5} {'old ms':>8} {'new ms':>8} {'speedup':>8} "
+          f"{'max d ratio':>12} {'max d int':>10} {'decisions':>10}")
+    for size in args.sizes:
+        for is_ct in (False, True):
+            slices = [slice_phantom(size, is_ct, seed=s, lesions=s % 4, dtype=np.float32)
+                      for s in range(args.slices)]
+            start = time.perf_counter()
+            ref = [tta_reference(img, is_ct) for img in slices]
+            old_ms = (time.perf_counter() - start) * 1000 / len(slices)
+            start = time.perf_counter()
+            new = [tta_consensus(img, is_ct) for img in slices]
+            new_ms = (time.perf_counter() - start) * 1000 / len(slices)
+
+            d_ratio = max(abs(a[1] - b[1]) for a, b in zip(ref, new))
+            d_int = max(abs(a[2] - b[2]) for a, b in zip(ref, new))
+            # process_analysis: is_anom = (ratio > 0.015) or (max_int > 50)
+            same = sum(((a[1] > 0.015) or (a[2] > 50)) == ((b[1] > 0.015) or (b[2] > 50))
+                       for a, b in zip(ref, new))
+            ok = d_ratio <= args.atol and d_int <= args.atol * 100 and same == len(slices)
+            failed |= not ok
+            print(f"{size:>6} {'ct' if is_ct else 'stat':<5} {old_ms:>8.1f} {new_ms:>8.1f} {old_ms / new_ms:>7.1f}x "
+                  f"{d_ratio:>12.2e} {d_int:>10.2e} {same:>5}/{len(slices)}{'' if ok else '  MISMATCH'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[224, 512])
+    parser.add_argument("--slices", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=1e-6)
+    raise SystemExit(main(parser.parse_args()))
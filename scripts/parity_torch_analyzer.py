@@ -0,0 +1,99 @@
+"""
+Parity of the torch robust analyzer (backend/detection/robust/torch_backend.py)
+with the NumPy/scipy one (batch.analyze_stack, tta_consensus_slices) on
+synthetic phantom volumes: decisions, confidences, ratios, max intensities
+and anomaly masks must be identical.
+
+    python scripts/parity_torch_analyzer.py
+    python scripts/parity_torch_analyzer.py --sizes 224 512 --slices 32 --threads 1 4
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.detection.robust.phantoms import volume_phantom
+from backend.detection.robust.batch import analyze_stack
+from backend.detection.robust.tta import tta_consensus_slices
+from backend.detection.robust import torch_backend
+
+
+def same_result(a, b):
+    is_anom_a, conf_a, mask_a, max_a, ratio_a, src_a = a
+    is_anom_b, conf_b, mask_b, max_b, ratio_b, src_b = b
+    return (is_anom_a == is_anom_b and conf_a == conf_b and max_a == max_b and ratio_a == ratio_b
+            and src_a == src_b and mask_a.dtype == mask_b.dtype and np.array_equal(mask_a, mask_b))
+
+
+def phantom(size, slices, is_ct, dtype, seed):
+    volume = volume_phantom(depth=slices, size=size, is_ct=is_ct, seed=seed, dtype=dtype)
+    # odd sizes also exercise non-square slices (crop a few columns)
+    return volume[:, :, size % 7 + 3:] if size % 2 else volume
+
+
+def main(args):
+    logging.disable(logging.INFO)
+    warmup = volume_phantom(depth=2, size=64)
+    analyze_stack(warmup)
+    torch_backend.analyze_stack(warmup)
+
+    failed = False
+    print(f"{'shape':>10} {'mode':<5} {'dtype':<8} {'slices':>9} {'tta':>9} {'numpy ms':>9} {'torch ms':>9} "
+          f"{'tta numpy':>10} {'tta torch':>10}")
+    for size in args.sizes:
+        for is_ct in (False, True):
+            for dtype in (np.float32, np.float64):
+                volume = phantom(size, args.slices, is_ct, dtype, args.seed)
+
+                start = time.perf_counter()
+                ref = analyze_stack(volume, is_ct)
+                numpy_ms = (time.perf_counter() - start) * 1000 / len(volume)
+                start = time.perf_counter()
+                new = torch_backend.analyze_stack(volume, is_ct)
+                torch_ms = (time.perf_counter() - start) * 1000 / len(volume)
+                slices_ok = sum(same_result(a, b) for a, b in zip(ref, new))
+
+                indices = range(len(volume))
+                start = time.perf_counter()
+                tta_ref = list(tta_consensus_slices(volume, indices, is_ct, backend="numpy"))
+                tta_numpy_ms = (time.perf_counter() - start) * 1000 / len(volume)
+                start = time.perf_counter()
+                tta_new = list(tta_consensus_slices(volume, indices, is_ct, backend="torch"))
+                tta_torch_ms = (time.perf_counter() - start) * 1000 / len(volume)
+                tta_ok = sum(a[0] == b[0] and same_result(a[1][0], b[1][0]) and a[1][1:] == b[1][1:]
+                             for a, b in zip(tta_ref, tta_new))
+
+                ok = slices_ok == len(volume) and tta_ok == len(volume)
+                failed |= not ok
+                shape = "x".join(map(str, volume.shape[1:]))
+                print(f"{shape:>10} {'ct' if is_ct else 'stat':<5} {np.dtype(dtype).name:<8} "
+                      f"{slices_ok:>4}/{len(volume):<4} {tta_ok:>4}/{len(volume):<4} {numpy_ms:>9.1f} {torch_ms:>9.1f} "
+                      f"{tta_numpy_ms:>10.1f} {tta_torch_ms:>10.1f}"
+                      f"{'' if ok else '  MISMATCH'}")
+
+    if args.threads:
+        import torch
+        volume = phantom(args.sizes[-1], args.slices, False, np.float32, args.seed)
+        print(f"\ntorch threads, {'x'.join(map(str, volume.shape))} stat:")
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+            start = time.perf_counter()
+            torch_backend.analyze_stack(volume)
+            print(f"{threads:>4} {(time.perf_counter() - start) * 1000 / len(volume):>9.1f} ms/slice")
+
+    print("PARITY FAILED" if failed else "PARITY OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[96, 161, 224])
+    parser.add_argument("--slices", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--threads", type=int, nargs="*", default=[])
+    raise SystemExit(main(parser.parse_args()))
@@ -1,16 +1,16 @@
-
-import os
-import shutil
-import glob
-import random
-
-def main():
-    print("Organizing dataset...")
-    # Logic to move files from Kaggle download structure to AuraMed structure
-    # dataset/xray/train/normal, etc.
-    
-    # Placeholder
-    pass
-
-if __name__ == "__main__":
-    main()
+
+import os
+import shutil
+import glob
+import random
+
+def main():
+    print("Organizing dataset...")
+    # Logic to move files from Kaggle download structure to AuraMed structure
+    # dataset/xray/train/normal, etc.
+    
+    # Placeholder
+    pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Pick the cascade uncertainty band for the DenseNet classifier.
+
+Scores every image of a dataset split with the reduced-resolution screen
+and the full 224px model, then reports per band: escalation rate, how
+often the cascade's anomaly decision (abnormal > 0.9, as in
+backend/app.py) agrees with the full model, and expected latency.
+
+    python scripts/tune_cascade.py --dataset xray
+    python scripts/tune_cascade.py --dataset mri --screen-size 96 --bands 0.3:0.99 0.5:0.98
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+import torch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.detection.registry import get_registry, densenet_key
+from backend.detection.densenet.batcher import forward_probs
+from backend.detection.densenet.cascade import downscale
+from backend.detection.densenet.infer import CLASS_MAP, preprocess_image
+
+ANOMALY_CUTOFF = 0.9
+
+
+def score_split(model, paths, screen_size, batch_size):
+    """(screen_abnormal, full_abnormal, screen_seconds, full_seconds) over all images."""
+    screen, full = [], []
+    screen_s = full_s = 0.0
+    idx = CLASS_MAP["abnormal"]
+
+    for i in range(0, len(paths), batch_size):
+        batch = torch.stack([preprocess_image(p) for p in paths[i:i + batch_size]])
+
+        start = time.perf_counter()
+        screen.append(forward_probs(model, downscale(batch, screen_size))[:, idx])
+        screen_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        full.append(forward_probs(model, batch)[:, idx])
+        full_s += time.perf_counter() - start
+
+    return torch.cat(screen), torch.cat(full), screen_s, full_s
+
+
+def main(args):
+    paths = sorted(glob.glob(os.path.join("dataset", args.dataset, args.split, "*", "*")))
+    if not paths:
+        print(f"No images under dataset/{args.dataset}/{args.split}")
+        return 1
+
+    model_path = os.path.join(args.models_dir, f"densenet_{args.dataset}.pth")
+    model = get_registry().get(densenet_key(model_path))
+    screen, full, screen_s, full_s = score_split(model, paths, args.screen_size, args.batch_size)
+
+    n = len(paths)
+    screen_ms = 1000 * screen_s / n
+    full_ms = 1000 * full_s / n
+    full_decision = full > ANOMALY_CUTOFF
+
+    print(f"{n} images, screen {args.screen_size}px {screen_ms:.2f} ms/img, full 224px {full_ms:.2f} ms/img")
+    print(f"{'band':<14} {'escalated':>10} {'agreement':>10} {'ms/img':>8} {'speedup':>8}")
+    for band in args.bands:
+        low, high = (float(v) for v in band.split(":"))
+        escalate = (screen >= low) & (screen <= high)
+        decision = torch.where(escalate, full, screen) > ANOMALY_CUTOFF
+        rate = escalate.float().mean().item()
+        agreement = (decision == full_decision).float().mean().item()
+        cost = screen_ms + rate * full_ms
+        print(f"{band:<14} {100 * rate:>9.1f}% {100 * agreement:>9.1f}% {cost:>8.2f} {full_ms / cost:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", required=True, choices=["xray", "mri"])
+    parser.add_argument("--split", default="val")
+    parser.add_argument("--screen-size", type=int, default=112)
+    parser.add_argument("--bands", nargs="+", default=["0.3:0.99", "0.5:0.98", "0.7:0.97", "0.8:0.95"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--models-dir", default="backend/models")
+    args = parser.parse_args()
+    raise SystemExit(main(args))